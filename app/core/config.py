@@ -73,11 +73,14 @@ class Settings(BaseSettings):
         alias="SHOW_TOKEN_CREATION_ROUTE",
     )
     api_tokens_collection: str = Field(default="api_tokens", alias="API_TOKENS_COLLECTION")
+    token_cache_ttl_seconds: float = Field(default=60.0, alias="TOKEN_CACHE_TTL_SECONDS")
+    token_clock_coarse: bool = Field(default=False, alias="TOKEN_CLOCK_COARSE")
 
     model_config = SettingsConfigDict(
         env_file=str(Path(__file__).resolve().parents[2] / ".env"),
         env_file_encoding="utf-8",
         extra="ignore",
+        frozen=True,
     )
 
     @field_validator("allowed_origins", mode="before")
@@ -143,7 +146,7 @@ class Settings(BaseSettings):
         return init_settings, lenient_env, lenient_dotenv, file_secret_settings
 
 
-@lru_cache
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Return cached application settings."""
 
@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
 try:  # pragma: no cover - optional dependency
     from pymongo import ASCENDING
@@ -35,22 +37,45 @@ from ..core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+TOKEN_HASH_INDEX_HINT = [("token_hash", 1)]
+MIN_CLEANUP_INTERVAL_SECONDS = 1
+
+# TTL indexes older releases created on time-series collections; expiry is handled by cleanup.
+_LEGACY_TTL_INDEX_NAMES = ("expires_at_ttl", "expires_at_1")
+
 
 class MongoConnectionError(RuntimeError):
     """Raised when the application cannot communicate with MongoDB."""
 
 
+def timeseries_index_key(time_field: str) -> List[Tuple[str, int]]:
+    """Return the key of the time index kept by :meth:`MongoDBManager._ensure_indexes`.
+
+    Query code passes the same key as a ``hint``, so it always names the built index.
+    """
+
+    return [(time_field, ASCENDING)]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class MongoDBManager:
-    """Manage MongoDB client, database and collection lifecycle."""
+    """Manage MongoDB client, database and collection lifecycle.
+
+    ``clock`` supplies the cutoff used by expiration cleanup; tests inject a fixed one.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, clock: Callable[[], datetime] = _utcnow) -> None:
+        self._clock = clock
         self._client: Optional[AsyncIOMotorClient] = None
         self._database_cache: Dict[str, AsyncIOMotorDatabase] = {}
         self._collection_cache: Dict[str, AsyncIOMotorCollection] = {}
         self._token_collection_cache: Dict[str, AsyncIOMotorCollection] = {}
         self._token_hash_cache: Dict[str, str] = {}
-        self._timeseries_cleanup_tracker: Dict[str, datetime] = {}
-        self._token_cleanup_tracker: Dict[str, datetime] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._init_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     @property
     def client(self) -> AsyncIOMotorClient:
@@ -97,8 +122,7 @@ class MongoDBManager:
         self._collection_cache.clear()
         self._token_collection_cache.clear()
         self._token_hash_cache.clear()
-        self._timeseries_cleanup_tracker.clear()
-        self._token_cleanup_tracker.clear()
+        self._init_locks.clear()
 
     async def _get_database(self, database_name: str) -> AsyncIOMotorDatabase:
         """Return (and cache) a database instance, creating it if necessary."""
@@ -106,8 +130,9 @@ class MongoDBManager:
         if self._client is None:
             raise MongoConnectionError("MongoDB client has not been initialized.")
 
-        if database_name in self._database_cache:
-            return self._database_cache[database_name]
+        cached = self._database_cache.get(database_name)
+        if cached is not None:
+            return cached
 
         database = self._client[database_name]
         existing_databases = await self._client.list_database_names()
@@ -120,138 +145,99 @@ class MongoDBManager:
     async def _ensure_timeseries_collection(
         self, database: AsyncIOMotorDatabase, database_name: str
     ) -> AsyncIOMotorCollection:
-        """Create a time-series collection for the given database if needed."""
+        """Create a time-series collection for the given database if needed.
 
-        settings = get_settings()
+        Initialization is serialized per database so concurrent first requests
+        do not both create the collection and its indexes.
+        """
 
-        existing_collections = await database.list_collection_names()
-        if settings.mongodb_collection not in existing_collections:
-            logger.info(
-                "Creating time-series collection %s in database %s",
-                settings.mongodb_collection,
-                database_name,
-            )
-            timeseries_options = {"timeField": settings.timeseries_time_field}
-            if settings.timeseries_meta_field:
-                timeseries_options["metaField"] = settings.timeseries_meta_field
-            try:
-                await database.create_collection(
-                    settings.mongodb_collection,
-                    timeseries=timeseries_options,
-                )
-            except CollectionInvalid:
-                logger.warning(
-                    "Collection %s already exists despite initial check.",
+        async with self._init_locks[database_name]:
+            cached = self._collection_cache.get(database_name)
+            if cached is not None:
+                return cached
+
+            settings = get_settings()
+
+            created = False
+            existing_collections = await database.list_collection_names()
+            if settings.mongodb_collection not in existing_collections:
+                logger.info(
+                    "Creating time-series collection %s in database %s",
                     settings.mongodb_collection,
+                    database_name,
                 )
+                timeseries_options = {"timeField": settings.timeseries_time_field}
+                if settings.timeseries_meta_field:
+                    timeseries_options["metaField"] = settings.timeseries_meta_field
+                try:
+                    await database.create_collection(
+                        settings.mongodb_collection,
+                        timeseries=timeseries_options,
+                    )
+                    created = True
+                except CollectionInvalid:
+                    logger.warning(
+                        "Collection %s already exists despite initial check.",
+                        settings.mongodb_collection,
+                    )
+
+            collection = database[settings.mongodb_collection]
+            await self._ensure_indexes(collection, newly_created=created)
+            self._collection_cache[database_name] = collection
+            return collection
+
+    async def _ensure_indexes(
+        self, collection: AsyncIOMotorCollection, newly_created: bool = False
+    ) -> None:
+        """Ensure indexes exist for efficient time-based queries.
 
-        collection = database[settings.mongodb_collection]
-        await self._ensure_indexes(collection)
-        self._collection_cache[database_name] = collection
-        return collection
-
-    async def _ensure_indexes(self, collection: AsyncIOMotorCollection) -> None:
-        """Ensure indexes exist for efficient time-based queries."""
+        A ``newly_created`` collection has no secondary indexes yet, so the
+        ``listIndexes`` round trip is skipped and the index is created directly.
+        """
 
-        settings = get_settings()
-        time_field = settings.timeseries_time_field
-        index_name = f"{time_field}_1"
+        index_specification = timeseries_index_key(get_settings().timeseries_time_field)
+        index_name = "_".join(f"{key}_{direction}" for key, direction in index_specification)
 
         try:
-            existing_indexes = await collection.index_information()
+            existing_indexes = {} if newly_created else await collection.index_information()
         except PyMongoError as error:
             logger.exception("Failed to inspect existing indexes: %s", error)
             raise MongoConnectionError("Failed to ensure MongoDB indexes.") from error
 
         existing_index = existing_indexes.get(index_name)
 
-        index_specification: List[Tuple[str, int]] = [(time_field, ASCENDING)]
         index_kwargs = {"name": index_name}
 
+        drops = [name for name in _LEGACY_TTL_INDEX_NAMES if name in existing_indexes]
+        needs_create = existing_index is None
+        if existing_index is not None and (
+            list(existing_index.get("key") or ()) != index_specification
+            or existing_index.get("expireAfterSeconds") is not None
+            or existing_index.get("partialFilterExpression") is not None
+        ):
+            drops.insert(0, index_name)
+            needs_create = True
+
         try:
-            if existing_index is None:
+            # Independent drops are issued concurrently; the time index is
+            # recreated only once its incompatible predecessor is gone.
+            if drops:
+                await asyncio.gather(*(collection.drop_index(name) for name in drops))
+            if needs_create:
                 await collection.create_index(index_specification, **index_kwargs)
-            else:
-                needs_recreation = False
-
-                existing_keys = existing_index.get("key") if existing_index is not None else None
-                if existing_keys is None or list(existing_keys) != index_specification:
-                    needs_recreation = True
-
-                if existing_index.get("expireAfterSeconds") is not None:
-                    needs_recreation = True
-
-                if existing_index.get("partialFilterExpression") is not None:
-                    needs_recreation = True
-
-                if needs_recreation:
-                    await collection.drop_index(index_name)
-                    await collection.create_index(index_specification, **index_kwargs)
-
-            ttl_index_candidates = [
-                ("expires_at_ttl", existing_indexes.get("expires_at_ttl")),
-                ("expires_at_1", existing_indexes.get("expires_at_1")),
-            ]
-            ttl_index_name = "expires_at_ttl"
-            existing_ttl_name = ttl_index_name
-            existing_ttl = None
-            for candidate_name, index_info in ttl_index_candidates:
-                if index_info is not None:
-                    existing_ttl_name = candidate_name
-                    existing_ttl = index_info
-                    break
-
-            if existing_ttl is not None:
-                await collection.drop_index(existing_ttl_name)
         except PyMongoError as error:
             logger.exception("Failed to ensure indexes: %s", error)
             raise MongoConnectionError("Failed to ensure MongoDB indexes.") from error
 
-    def _should_run_cleanup(
-        self,
-        tracker: Dict[str, datetime],
-        key: str,
-        now: datetime,
-        interval_seconds: int,
-    ) -> bool:
-        """Return ``True`` when cleanup should execute for ``key``."""
-
-        last_run = tracker.get(key)
-        if last_run is None:
-            tracker[key] = now
-            return True
-
-        interval = timedelta(seconds=max(interval_seconds, 0))
-        if interval <= timedelta(0):
-            tracker[key] = now
-            return True
-
-        if now - last_run >= interval:
-            tracker[key] = now
-            return True
-
-        return False
-
     async def _cleanup_timeseries_collection(
         self,
         collection: "AsyncIOMotorCollection",
         database_name: str,
+        now: datetime,
     ) -> None:
-        """Best-effort removal of expired time-series documents."""
+        """Best-effort removal of time-series documents that expired by ``now``."""
 
         settings = get_settings()
-        interval = settings.expiration_cleanup_interval_seconds
-        now = datetime.now(timezone.utc)
-
-        should_cleanup = interval <= 0 or self._should_run_cleanup(
-            self._timeseries_cleanup_tracker,
-            database_name,
-            now,
-            interval,
-        )
-
-        if not should_cleanup:
-            return
 
         try:
             result = await collection.delete_many({"expires_at": {"$lte": now}})
@@ -277,50 +263,22 @@ class MongoDBManager:
         self,
         collection: "AsyncIOMotorCollection",
         database_name: str,
+        now: datetime,
     ) -> None:
-        """Remove expired API tokens and clear their cached lookups."""
-
-        settings = get_settings()
-        interval = settings.expiration_cleanup_interval_seconds
-        now = datetime.now(timezone.utc)
-
-        should_cleanup = interval <= 0 or self._should_run_cleanup(
-            self._token_cleanup_tracker,
-            database_name,
-            now,
-            interval,
-        )
-
-        if not should_cleanup:
-            return
-
-        try:
-            cursor = collection.find(
-                {"expires_at": {"$lte": now}},
-                projection={"_id": 1, "token_hash": 1},
-            )
-            expired_documents = await cursor.to_list(length=None)
-        except PyMongoError as error:
-            logger.warning(
-                "Failed to inspect expired API tokens for %s.%s: %s",
-                database_name,
-                settings.api_tokens_collection,
-                error,
-            )
-            return
+        """Remove tokens expired by ``now`` with a single ``delete_many``.
 
-        if not expired_documents:
-            return
+        The expired hashes are not read back, so when anything was deleted every
+        cached lookup routed to ``database_name`` is forgotten; live tokens are
+        re-routed on their next lookup.
+        """
 
-        token_ids = [doc.get("_id") for doc in expired_documents if doc.get("_id") is not None]
-        if not token_ids:
-            return
+        settings = get_settings()
 
         try:
-            result = await collection.delete_many({"_id": {"$in": token_ids}})
+            result = await collection.delete_many({"expires_at": {"$lte": now}})
         except PyMongoError as error:
             logger.warning(
-                "Failed to delete expired API tokens for %s.%s: %s",
+                "Failed to purge expired API tokens for %s.%s: %s",
                 database_name,
                 settings.api_tokens_collection,
                 error,
@@ -329,6 +287,11 @@ class MongoDBManager:
 
         deleted = getattr(result, "deleted_count", 0)
         if deleted:
+            self._token_hash_cache = {
+                token_hash: cached_database
+                for token_hash, cached_database in self._token_hash_cache.items()
+                if cached_database != database_name
+            }
             logger.info(
                 "Removed %d expired API tokens from %s.%s",
                 deleted,
@@ -336,10 +299,50 @@ class MongoDBManager:
                 settings.api_tokens_collection,
             )
 
-        for document in expired_documents:
-            token_hash = document.get("token_hash")
-            if token_hash:
-                self._token_hash_cache.pop(token_hash, None)
+    async def run_expiration_cleanup(self) -> None:
+        """Purge expired documents and tokens from every initialized collection."""
+
+        now = self._clock()
+        for database_name, collection in list(self._collection_cache.items()):
+            await self._cleanup_timeseries_collection(collection, database_name, now)
+        for database_name, collection in list(self._token_collection_cache.items()):
+            await self._cleanup_token_collection(collection, database_name, now)
+
+    async def _run_cleanup_loop(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.run_expiration_cleanup()
+            except Exception:  # noqa: BLE001 - a failed pass must not end the loop
+                logger.exception("Expiration cleanup pass failed")
+
+    def start_cleanup(self) -> None:
+        """Schedule the periodic expiration cleanup on the running event loop.
+
+        Runs every ``EXPIRATION_CLEANUP_INTERVAL_SECONDS``, but no more than once per
+        ``MIN_CLEANUP_INTERVAL_SECONDS`` when the setting is zero or negative.
+        """
+
+        interval = max(
+            get_settings().expiration_cleanup_interval_seconds, MIN_CLEANUP_INTERVAL_SECONDS
+        )
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.get_running_loop().create_task(
+                self._run_cleanup_loop(interval)
+            )
+
+    async def stop_cleanup(self) -> None:
+        """Cancel the periodic expiration cleanup task."""
+
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:  # noqa: BLE001 - shutdown must continue past a crashed task
+                logger.exception("Expiration cleanup task ended with an error")
+            self._cleanup_task = None
 
     async def _ensure_token_collection(
         self, database: AsyncIOMotorDatabase
@@ -382,28 +385,24 @@ class MongoDBManager:
     ) -> AsyncIOMotorCollection:
         """Return the time-series collection associated with ``database_name``."""
 
-        if database_name in self._collection_cache:
-            collection = self._collection_cache[database_name]
-        else:
-            database = await self._get_database(database_name)
-            collection = await self._ensure_timeseries_collection(database, database_name)
+        cached = self._collection_cache.get(database_name)
+        if cached is not None:
+            return cached
 
-        await self._cleanup_timeseries_collection(collection, database_name)
-        return collection
+        database = await self._get_database(database_name)
+        return await self._ensure_timeseries_collection(database, database_name)
 
     async def get_token_collection_for_database(
         self, database_name: str
     ) -> AsyncIOMotorCollection:
         """Return the token collection stored inside ``database_name``."""
 
-        if database_name in self._token_collection_cache:
-            collection = self._token_collection_cache[database_name]
-        else:
-            database = await self._get_database(database_name)
-            collection = await self._ensure_token_collection(database)
+        cached = self._token_collection_cache.get(database_name)
+        if cached is not None:
+            return cached
 
-        await self._cleanup_token_collection(collection, database_name)
-        return collection
+        database = await self._get_database(database_name)
+        return await self._ensure_token_collection(database)
 
     def remember_token_location(self, token_hash: str, database_name: str) -> None:
         """Cache the database where ``token_hash`` is persisted."""
@@ -439,7 +438,6 @@ class MongoDBManager:
 
         for cached_name, collection in list(self._token_collection_cache.items()):
             if database_name is None or cached_name == database_name:
-                await self._cleanup_token_collection(collection, cached_name)
                 collections.append((cached_name, collection))
                 seen.add(cached_name)
 
@@ -464,16 +462,18 @@ class MongoDBManager:
                 continue
 
             collection = await self._ensure_token_collection(database)
-            await self._cleanup_token_collection(collection, name)
             collections.append((name, collection))
             seen.add(name)
 
         return collections
 
     async def find_token_document(
-        self, token_hash: str
+        self, token_hash: str, projection: Optional[Dict[str, int]] = None
     ) -> Tuple[Optional[dict], Optional[AsyncIOMotorCollection]]:
-        """Locate the token document associated with ``token_hash`` across databases."""
+        """Locate the token document associated with ``token_hash`` across databases.
+
+        ``projection`` limits the returned fields; by default the whole document is read.
+        """
 
         if self._client is None:
             raise MongoConnectionError("MongoDB client has not been initialized.")
@@ -488,7 +488,9 @@ class MongoDBManager:
                 self._token_hash_cache.pop(token_hash, None)
             else:
                 try:
-                    document = await collection.find_one({"token_hash": token_hash})
+                    document = await collection.find_one(
+                        {"token_hash": token_hash}, projection=projection, hint=TOKEN_HASH_INDEX_HINT
+                    )
                 except PyMongoError as error:
                     logger.exception("Failed to fetch API token metadata: %s", error)
                     raise MongoConnectionError("Failed to query MongoDB for API tokens.") from error
@@ -500,7 +502,9 @@ class MongoDBManager:
 
         for database_name, collection in list(self._token_collection_cache.items()):
             try:
-                document = await collection.find_one({"token_hash": token_hash})
+                document = await collection.find_one(
+                    {"token_hash": token_hash}, projection=projection, hint=TOKEN_HASH_INDEX_HINT
+                )
             except PyMongoError as error:
                 logger.exception("Failed to fetch API token metadata: %s", error)
                 raise MongoConnectionError("Failed to query MongoDB for API tokens.") from error
@@ -535,7 +539,9 @@ class MongoDBManager:
             collection = await self._ensure_token_collection(database)
 
             try:
-                document = await collection.find_one({"token_hash": token_hash})
+                document = await collection.find_one(
+                    {"token_hash": token_hash}, projection=projection, hint=TOKEN_HASH_INDEX_HINT
+                )
             except PyMongoError as error:
                 logger.exception("Failed to fetch API token metadata: %s", error)
                 raise MongoConnectionError("Failed to query MongoDB for API tokens.") from error
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import hmac
+import re
 from dataclasses import dataclass
-from typing import AsyncGenerator, Optional, TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
 
 from fastapi import Depends, Header, HTTPException, status
 
@@ -12,17 +14,24 @@ from .db.mongo import MongoConnectionError, mongo_manager
 from .services.tokens import (
     TokenNotFoundError,
     TokenPersistenceError,
-    fetch_token_metadata,
+    digest_token,
+    fetch_token_database,
 )
 
 if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
     from motor.motor_asyncio import AsyncIOMotorCollection
 
+settings = get_settings()
+_ADMIN_TOKEN_DIGEST = digest_token(settings.api_admin_token)
+
 AUTHORIZATION_HEADER = "Authorization"
 DATABASE_OVERRIDE_HEADER = "X-Database-Name"
 
+# Case-insensitive scheme, one space, then the credentials without surrounding whitespace.
+_BEARER_PATTERN = re.compile(r"bearer \s*(\S(?:.*\S)?)\s*", re.IGNORECASE | re.DOTALL)
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TokenContext:
     """Information about the caller extracted from the API token."""
 
@@ -41,28 +50,14 @@ def _extract_bearer_token(authorization_header: Optional[str]) -> str:
     if not authorization:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="API token required.")
 
-    scheme, _, credentials = authorization.partition(" ")
-
-    if credentials == "":
-        raise HTTPException(
-            status.HTTP_401_UNAUTHORIZED,
-            detail="Authorization header must be a Bearer token.",
-        )
-
-    if scheme.lower() != "bearer":
+    match = _BEARER_PATTERN.fullmatch(authorization)
+    if match is None:
         raise HTTPException(
             status.HTTP_401_UNAUTHORIZED,
             detail="Authorization header must be a Bearer token.",
         )
 
-    token = credentials.strip()
-    if not token:
-        raise HTTPException(
-            status.HTTP_401_UNAUTHORIZED,
-            detail="Authorization header must be a Bearer token.",
-        )
-
-    return token
+    return match.group(1)
 
 
 async def get_token_context(
@@ -79,17 +74,17 @@ async def get_token_context(
 ) -> TokenContext:
     """Validate the provided API token and resolve the target database."""
 
-    settings = get_settings()
-
     token = _extract_bearer_token(authorization)
 
     override = database_override.strip() if database_override else None
 
-    if token == settings.api_admin_token:
+    # Hashed once: the digest serves the constant-time admin check and the token lookup.
+    digest = digest_token(token)
+    if hmac.compare_digest(digest, _ADMIN_TOKEN_DIGEST):
         return TokenContext(token=token, database_name=override, is_admin=True)
 
     try:
-        metadata = await fetch_token_metadata(token)
+        token_database = await fetch_token_database(token, digest=digest)
     except TokenNotFoundError as error:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Invalid API token.") from error
     except TokenPersistenceError as error:
@@ -98,13 +93,13 @@ async def get_token_context(
             detail="Unable to validate API token.",
         ) from error
 
-    if override and override != metadata.database:
+    if override and override != token_database:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
             detail="The provided token does not grant access to the requested database.",
         )
 
-    return TokenContext(token=token, database_name=metadata.database, is_admin=False)
+    return TokenContext(token=token, database_name=token_database, is_admin=False)
 
 
 async def require_admin_context(
@@ -119,7 +114,7 @@ async def require_admin_context(
 
 async def get_timeseries_collection(
     context: TokenContext = Depends(get_token_context),
-) -> AsyncGenerator[AsyncIOMotorCollection, None]:
+) -> AsyncIOMotorCollection:
     """Provide a MongoDB collection based on the caller token context."""
 
     if context.database_name is None:
@@ -138,4 +133,4 @@ async def get_timeseries_collection(
             detail="MongoDB connection is not available.",
         ) from error
 
-    yield collection
+    return collection
@@ -8,9 +8,10 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .core.config import get_settings
+from .core.config import Settings, get_settings
 from .db.mongo import MongoConnectionError, mongo_manager
 from .routes import discover_routers, include_routers
+from .services.tokens import token_clock, token_usage_recorder
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -18,7 +19,9 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Handle application startup and shutdown."""
+    """Handle application startup and shutdown using the settings stored on ``app.state``."""
+
+    app_settings: Settings = app.state.settings
 
     try:
         await mongo_manager.connect()
@@ -27,33 +30,48 @@ async def lifespan(app: FastAPI):
         logger.exception("Failed to connect to MongoDB: %s", error)
         raise
 
+    if app_settings.token_clock_coarse:
+        token_clock.start()
+    token_usage_recorder.start()
+    mongo_manager.start_cleanup()
+
     try:
         yield
     finally:
+        await mongo_manager.stop_cleanup()
+        await token_usage_recorder.stop()
+        await token_clock.stop()
         await mongo_manager.close()
         logger.info("MongoDB connection closed")
 
 with open("README.md", "r", encoding="utf-8") as f:
     readme_content = f.read()
 
-app = FastAPI(
-    title=settings.app_name,
-    # description=readme_content,
-    version="1.0.0",
-    docs_url="/docs" if settings.environment != "production" else None,
-    redoc_url="/redoc" if settings.environment != "production" else None,
-    lifespan=lifespan,
-)
-
-
-if settings.allowed_origins:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.allowed_origins,
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+
+def create_app(app_settings: Settings) -> FastAPI:
+    """Build the FastAPI application configured from ``app_settings``."""
+
+    application = FastAPI(
+        title=app_settings.app_name,
+        # description=readme_content,
+        version="1.0.0",
+        docs_url="/docs" if app_settings.environment != "production" else None,
+        redoc_url="/redoc" if app_settings.environment != "production" else None,
+        lifespan=lifespan,
     )
+    application.state.settings = app_settings
+
+    if app_settings.allowed_origins:
+        application.add_middleware(
+            CORSMiddleware,
+            allow_origins=app_settings.allowed_origins,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    include_routers(application, discover_routers(), prefix=app_settings.api_prefix)
+    return application
 
 
-include_routers(app, discover_routers(), prefix=settings.api_prefix)
+app = create_app(settings)
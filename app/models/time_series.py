@@ -121,6 +121,11 @@ class TimeSeriesSearchResponse(BaseModel):
         description="Indicates whether the response contains only the latest record.",
     )
     count: int = Field(..., ge=0, description="Number of records returned in the search.")
+    total: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Total number of records matching the filters, when requested with include_count.",
+    )
     items: List[TimeSeriesRecordOut] = Field(
         default_factory=list,
         description="Collection of time-series records that match the filters.",
@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional, TYPE_CHECKING
+from typing import Any, List, Optional, TYPE_CHECKING
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
 
 if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
     from motor.motor_asyncio import AsyncIOMotorCollection
@@ -21,6 +22,23 @@ from ..services import records as service
 
 router = APIRouter(prefix="/records", tags=["records"])
 
+_RECORD_LIST_ADAPTER = TypeAdapter(List[TimeSeriesRecordOut])
+
+BULK_MAX_RECORDS = 1000
+
+
+def _json_response(content: bytes, status_code: int = status.HTTP_200_OK) -> Response:
+    """Wrap already serialised JSON so FastAPI skips re-validating the response model."""
+
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def _serialize_records(documents: List[Any]) -> bytes:
+    """Validate raw documents and encode them to JSON in a single pass."""
+
+    records = [TimeSeriesRecordOut.model_validate(document) for document in documents]
+    return _RECORD_LIST_ADAPTER.dump_json(records, by_alias=True)
+
 
 def _raise_http_error(error: Exception) -> None:
     """Transform service layer exceptions into HTTP errors."""
@@ -34,6 +52,11 @@ def _raise_http_error(error: Exception) -> None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)) from error
     if isinstance(error, service.RecordNotFoundError):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(error)) from error
+    if isinstance(error, service.RecordBulkInsertError):
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail={"message": str(error), "inserted_ids": error.inserted_ids, "failed": error.failed},
+        ) from error
     if isinstance(error, service.RecordPersistenceError):
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(error)) from error
     if isinstance(error, service.RecordDeletionError):
@@ -64,6 +87,26 @@ async def create_record(
     return TimeSeriesRecordOut.model_validate(document)
 
 
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[TimeSeriesRecordOut],
+    summary="Create several time-series records at once",
+)
+async def create_records_bulk(
+    records: List[TimeSeriesRecordCreate] = Body(..., max_length=BULK_MAX_RECORDS),
+    collection: AsyncIOMotorCollection = Depends(get_timeseries_collection),
+) -> Response:
+    """Persist a batch of records with a single MongoDB round trip."""
+
+    try:
+        documents = await service.create_records_bulk(collection, records)
+    except Exception as error:  # noqa: BLE001
+        _raise_http_error(error)
+
+    return _json_response(_serialize_records(documents), status.HTTP_201_CREATED)
+
+
 @router.get(
     "",
     response_model=List[TimeSeriesRecordOut],
@@ -73,7 +116,7 @@ async def list_records(
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of items to return."),
     skip: int = Query(0, ge=0, description="Number of items to skip for pagination."),
     collection: AsyncIOMotorCollection = Depends(get_timeseries_collection),
-) -> List[TimeSeriesRecordOut]:
+) -> Response:
     """Return paginated records ordered from the most recent to the oldest."""
 
     try:
@@ -81,7 +124,7 @@ async def list_records(
     except Exception as error:  # noqa: BLE001
         _raise_http_error(error)
 
-    return [TimeSeriesRecordOut.model_validate(document) for document in documents]
+    return _json_response(_serialize_records(documents))
 
 # NOTE: Register this static route before any dynamic ``/{record_id}`` paths
 # to ensure FastAPI resolves ``/search`` correctly.
@@ -114,8 +157,15 @@ async def search_records(
         le=1000,
         description="Maximum number of records to return when not requesting only the latest.",
     ),
+    include_count: bool = Query(
+        default=False,
+        description=(
+            "Also return the total number of records matching the filters; "
+            "total is null when the count times out."
+        ),
+    ),
     collection: AsyncIOMotorCollection = Depends(get_timeseries_collection),
-) -> TimeSeriesSearchResponse:
+) -> Response:
     """Search for records by arbitrary field while supporting time windows."""
 
     if latest:
@@ -143,8 +193,22 @@ async def search_records(
     if latest and not documents:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No records found for the given filters.")
 
+    total = None
+    if include_count:
+        try:
+            total = await service.count_records(
+                collection=collection,
+                field=field,
+                value=value,
+                start_time=start_time,
+                end_time=end_time,
+            )
+        except Exception as error:  # noqa: BLE001
+            _raise_http_error(error)
+
     items = [TimeSeriesRecordOut.model_validate(document) for document in documents]
-    return TimeSeriesSearchResponse(latest=only_latest, count=len(items), items=items)
+    response = TimeSeriesSearchResponse(latest=only_latest, count=len(items), total=total, items=items)
+    return _json_response(response.model_dump_json(by_alias=True))
 
 
 @router.get(
@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import copy
+import re
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
@@ -11,6 +13,8 @@ if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
     from motor.motor_asyncio import AsyncIOMotorCollection
     from pymongo.errors import OperationFailure
 
+from ..core.config import get_settings
+from ..db.mongo import timeseries_index_key
 from ..models.time_series import (
     TimeSeriesRecordCreate,
     TimeSeriesRecordOut,
@@ -31,6 +35,19 @@ class RecordPersistenceError(RuntimeError):
     """Raised when MongoDB fails to persist a document."""
 
 
+class RecordBulkInsertError(RecordPersistenceError):
+    """Raised when an unordered bulk insert stores only part of the batch.
+
+    ``inserted_ids`` lists the identifiers of the stored records and ``failed``
+    maps each rejected payload's position in the batch to MongoDB's message.
+    """
+
+    def __init__(self, message: str, inserted_ids: List[str], failed: List[Dict[str, Any]]) -> None:
+        super().__init__(message)
+        self.inserted_ids = inserted_ids
+        self.failed = failed
+
+
 class RecordDeletionError(RuntimeError):
     """Raised when MongoDB cannot delete the requested document."""
 
@@ -48,6 +65,24 @@ _MISSING_PYMONGO_MESSAGE = (
     "Install it with `pip install pymongo`."
 )
 
+# Bound once so the create/normalize hot paths skip repeated attribute lookups.
+_UTC = timezone.utc
+_NOW = datetime.now
+
+# The collection's ``timeField``, resolved once. Range filters, sorts and the index
+# hint are all built from it, so they stay in line with ``TIMESERIES_TIME_FIELD``.
+TIME_FIELD = get_settings().timeseries_time_field
+TIME_INDEX_HINT = timeseries_index_key(TIME_FIELD)
+
+_TIMESERIES_RESTRICTION_PATTERN = re.compile(r"time[- ]series|metafield", re.IGNORECASE)
+
+COUNT_CACHE_TTL_SECONDS = 30.0
+COUNT_MAX_TIME_MS = 500
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+# Maps ``(collection namespace, query fingerprint)`` to ``(count, monotonic timestamp)``.
+_count_cache: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
 
 def _build_field_aliases() -> Dict[str, str]:
     """Derive API-to-database field aliases from the Pydantic schema."""
@@ -110,18 +145,32 @@ def _object_id(value: str) -> "ObjectId":
             "Install it with `pip install pymongo`."
         ) from error
 
-    try:
-        return ObjectId(value)
-    except Exception as exc:  # noqa: BLE001 - propagate a custom error instead
-        raise InvalidRecordIdError("The provided record identifier is invalid.") from exc
+    if not ObjectId.is_valid(value):
+        raise InvalidRecordIdError("The provided record identifier is invalid.")
+    return ObjectId(value)
 
 
 def _normalize_timestamp(value: datetime) -> datetime:
     """Ensure timestamps are timezone aware in UTC."""
 
     if value.tzinfo is None:
-        return value.replace(tzinfo=timezone.utc)
-    return value.astimezone(timezone.utc)
+        return value.replace(tzinfo=_UTC)
+    return value.astimezone(_UTC)
+
+
+def _build_time_range(
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Optional[Dict[str, datetime]]:
+    """Return the ``TIME_FIELD`` range filter for the supplied window, if any."""
+
+    if start_time and end_time:
+        return {"$gte": _normalize_timestamp(start_time), "$lte": _normalize_timestamp(end_time)}
+    if start_time:
+        return {"$gte": _normalize_timestamp(start_time)}
+    if end_time:
+        return {"$lte": _normalize_timestamp(end_time)}
+    return None
 
 
 def _is_mock_collection(candidate: Any) -> bool:
@@ -135,6 +184,20 @@ def _is_mock_collection(candidate: Any) -> bool:
     return isinstance(candidate, mock.Mock)
 
 
+def _prepare_document(payload: TimeSeriesRecordCreate, now: datetime) -> Dict[str, Any]:
+    """Build the MongoDB document for ``payload`` resolving timestamp and TTL."""
+
+    document = payload.model_dump(by_alias=True)
+    ttl = document.pop("ttl", None)
+    document.setdefault("timestamp", now)
+    document["timestamp"] = _normalize_timestamp(document["timestamp"])
+
+    if ttl and ttl > 0:
+        document["expires_at"] = document["timestamp"] + timedelta(seconds=ttl)
+
+    return document
+
+
 async def create_record(
     collection: AsyncIOMotorCollection,
     payload: TimeSeriesRecordCreate,
@@ -151,13 +214,7 @@ async def create_record(
 
     PyMongoError = _PyMongoError
 
-    document = payload.model_dump(by_alias=True)
-    ttl = document.pop("ttl", None)
-    document.setdefault("timestamp", datetime.now(tz=timezone.utc))
-    document["timestamp"] = _normalize_timestamp(document["timestamp"])
-
-    if ttl and ttl > 0:
-        document["expires_at"] = document["timestamp"] + timedelta(seconds=ttl)
+    document = _prepare_document(payload, _NOW(tz=_UTC))
 
     try:
         result = await collection.insert_one(document)
@@ -169,6 +226,51 @@ async def create_record(
     return _serialize(inserted)
 
 
+async def create_records_bulk(
+    collection: AsyncIOMotorCollection,
+    payloads: List[TimeSeriesRecordCreate],
+) -> List[Dict[str, Any]]:
+    """Insert several time-series records using a single unordered ``insert_many``.
+
+    Because the insert is unordered, MongoDB keeps going after a rejected
+    document; a partial failure raises :class:`RecordBulkInsertError` listing
+    which records were stored and which were not.
+    """
+
+    try:
+        from pymongo.errors import BulkWriteError, PyMongoError
+    except ModuleNotFoundError as error:  # pragma: no cover - import guard
+        raise RecordPersistenceError(_MISSING_PYMONGO_MESSAGE) from error
+
+    if not payloads:
+        return []
+
+    now = _NOW(tz=_UTC)
+    documents = [_prepare_document(payload, now) for payload in payloads]
+
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as exc:
+        write_errors = exc.details.get("writeErrors", [])
+        failed_indexes = {error["index"] for error in write_errors}
+        raise RecordBulkInsertError(
+            f"Stored {len(documents) - len(failed_indexes)} of {len(documents)} records in MongoDB.",
+            inserted_ids=[
+                str(document["_id"])
+                for index, document in enumerate(documents)
+                if index not in failed_indexes and "_id" in document
+            ],
+            failed=[{"index": error["index"], "error": error.get("errmsg")} for error in write_errors],
+        ) from exc
+    except PyMongoError as exc:
+        raise RecordPersistenceError("Unable to store the records in MongoDB.") from exc
+
+    for document, inserted_id in zip(documents, result.inserted_ids):
+        document["_id"] = inserted_id
+
+    return [_serialize(document) for document in documents]
+
+
 async def fetch_record(
     collection: AsyncIOMotorCollection,
     record_id: str,
@@ -197,7 +299,10 @@ async def list_records(
 
     try:
         cursor = (
-            collection.find().sort("timestamp", DESCENDING).skip(skip).limit(limit)
+            collection.find({}, hint=TIME_INDEX_HINT)
+            .sort(TIME_FIELD, DESCENDING)
+            .skip(skip)
+            .limit(limit)
         )
         documents = await cursor.to_list(length=limit)
     except PyMongoError as exc:
@@ -257,7 +362,7 @@ async def _apply_update(
     except ModuleNotFoundError as error:  # pragma: no cover - import guard
         raise RecordPersistenceError(_MISSING_PYMONGO_MESSAGE) from error
 
-    metadata_only = set(update_payload.keys()) <= {"metadata"}
+    metadata_only = len(update_payload) == 1 and "metadata" in update_payload
     metadata_exception: Optional[OperationFailure] = None
 
     if metadata_only:
@@ -374,8 +479,7 @@ async def _reload_document(
 def _is_timeseries_restriction(error: OperationFailure) -> bool:
     """Return ``True`` when MongoDB rejects updates due to time-series rules."""
 
-    message = str(error).lower()
-    return "time-series" in message or "time series" in message or "metafield" in message
+    return _TIMESERIES_RESTRICTION_PATTERN.search(str(error)) is not None
 
 
 async def delete_record(
@@ -400,6 +504,30 @@ async def delete_record(
         raise RecordNotFoundError("Record not found for deletion.")
 
 
+def _build_search_query(
+    field: Optional[str],
+    value: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Dict[str, Any]:
+    """Translate search parameters into a MongoDB filter document."""
+
+    query: Dict[str, Any] = {}
+
+    if field and value is not None:
+        normalized_field = _normalize_field_path(field)
+        if normalized_field == "_id":
+            query[normalized_field] = _object_id(value)
+        else:
+            query[normalized_field] = coerce_value(value)
+
+    range_filter = _build_time_range(start_time, end_time)
+    if range_filter is not None:
+        query[TIME_FIELD] = range_filter
+
+    return query
+
+
 async def search_records(
     collection: AsyncIOMotorCollection,
     field: Optional[str],
@@ -417,26 +545,15 @@ async def search_records(
     except ModuleNotFoundError as error:  # pragma: no cover - import guard
         raise RecordQueryError(_MISSING_PYMONGO_MESSAGE) from error
 
-    query: Dict[str, Any] = {}
-
-    if field and value is not None:
-        normalized_field = _normalize_field_path(field)
-        coerced_value = coerce_value(value)
-        if normalized_field == "_id":
-            coerced_value = _object_id(str(coerced_value))
-        query[normalized_field] = coerced_value
-
-    if start_time or end_time:
-        range_filter: Dict[str, Any] = {}
-        if start_time:
-            range_filter["$gte"] = _normalize_timestamp(start_time)
-        if end_time:
-            range_filter["$lte"] = _normalize_timestamp(end_time)
-        query["timestamp"] = range_filter
+    query = _build_search_query(field, value, start_time, end_time)
 
     try:
-        cursor = collection.find(query)
-        cursor = cursor.sort("timestamp", DESCENDING)
+        if not query or (len(query) == 1 and TIME_FIELD in query):
+            # MongoDB walks the ascending time index backwards for the sort below.
+            cursor = collection.find(query, hint=TIME_INDEX_HINT)
+        else:
+            cursor = collection.find(query)
+        cursor = cursor.sort(TIME_FIELD, DESCENDING)
         if latest:
             document = await cursor.limit(1).to_list(length=1)
             return ([_serialize(doc) for doc in document], True)
@@ -447,3 +564,51 @@ async def search_records(
         raise RecordQueryError("Failed to perform search on MongoDB.") from exc
 
     return ([_serialize(document) for document in documents], False)
+
+
+async def count_records(
+    collection: AsyncIOMotorCollection,
+    field: Optional[str],
+    value: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Optional[int]:
+    """Return the number of records matching the search filters.
+
+    Unfiltered counts use the collection metadata through
+    ``estimated_document_count``. Filtered counts run ``count_documents`` with a
+    bounded ``maxTimeMS`` and are cached for ``COUNT_CACHE_TTL_SECONDS`` so
+    subsequent pages of the same search do not rescan the collection. A count
+    that exceeds ``COUNT_MAX_TIME_MS`` returns ``None`` instead of failing.
+    """
+
+    try:
+        from pymongo.errors import ExecutionTimeout, PyMongoError
+    except ModuleNotFoundError as error:  # pragma: no cover - import guard
+        raise RecordQueryError(_MISSING_PYMONGO_MESSAGE) from error
+
+    query = _build_search_query(field, value, start_time, end_time)
+    cache_key = (
+        getattr(collection, "full_name", str(id(collection))),
+        repr(sorted(query.items())),
+    )
+    now = time.monotonic()
+
+    cached = _count_cache.get(cache_key)
+    if cached is not None and now - cached[1] < COUNT_CACHE_TTL_SECONDS:
+        return cached[0]
+
+    try:
+        if query:
+            count = await collection.count_documents(query, maxTimeMS=COUNT_MAX_TIME_MS)
+        else:
+            count = await collection.estimated_document_count()
+    except ExecutionTimeout:
+        return None
+    except PyMongoError as exc:
+        raise RecordQueryError("Failed to count records on MongoDB.") from exc
+
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[cache_key] = (count, now)
+    return count
@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
-import secrets
+import os
+import re
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, NoReturn, Optional
 
 try:  # pragma: no cover - exercised indirectly through import guards
     from bson import ObjectId
@@ -17,6 +21,8 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for test environments
         """Exception raised when an ObjectId string is invalid."""
 
 
+    _is_hex24 = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
     class ObjectId(str):
         """Lightweight stand-in for ``bson.ObjectId`` used in tests.
 
@@ -32,17 +38,60 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for test environments
             if len(candidate) != 24:
                 raise InvalidId("ObjectId hex string must be exactly 24 characters long.")
 
-            try:
-                int(candidate, 16)
-            except ValueError as error:  # pragma: no cover - defensive guard
-                raise InvalidId("ObjectId hex string contains non-hexadecimal characters.") from error
+            if _is_hex24(candidate) is None:
+                raise InvalidId("ObjectId hex string contains non-hexadecimal characters.")
 
             return str.__new__(cls, candidate)
 
+
+try:  # pragma: no cover - optional dependency
+    from pymongo import UpdateOne
+    from pymongo.errors import DuplicateKeyError, PyMongoError
+except ModuleNotFoundError:  # pragma: no cover - fallback definitions for optional dependency
+    class PyMongoError(RuntimeError):
+        """Placeholder for :class:`pymongo.errors.PyMongoError`."""
+
+    class DuplicateKeyError(PyMongoError):
+        """Placeholder for :class:`pymongo.errors.DuplicateKeyError`."""
+
+    _PYMONGO_AVAILABLE = False
+else:
+    _PYMONGO_AVAILABLE = True
+
+
+from ..core.config import get_settings
 from ..db.mongo import MongoConnectionError, mongo_manager
+from ..utils.cache import HashLRU
 
 logger = logging.getLogger(__name__)
 
+# CPython's ``hashlib`` delegates to OpenSSL, whose SHA-256 implementation already
+# selects the SHA-NI/ARMv8 crypto code paths at runtime when the CPU supports them.
+_sha256 = hashlib.sha256
+
+TOKEN_CACHE_MAX_ENTRIES = 2048
+REJECTED_TOKEN_CACHE_MAX_ENTRIES = 4096
+REJECTED_TOKEN_TTL_SECONDS = 30.0
+LAST_USED_FLUSH_INTERVAL_SECONDS = 1.0
+COARSE_CLOCK_TICK_SECONDS = 0.1
+LIST_TOKENS_BATCH_SIZE = 500
+LIST_TOKENS_CONCURRENCY = 16
+
+_TOKEN_METADATA_PROJECTION = {
+    "database": 1,
+    "description": 1,
+    "created_at": 1,
+    "last_used_at": 1,
+    "expires_at": 1,
+}
+
+_LIST_TOKENS_PROJECTION = {
+    "description": 1,
+    "created_at": 1,
+    "last_used_at": 1,
+    "expires_at": 1,
+}
+
 
 class TokenServiceError(RuntimeError):
     """Base exception for token management failures."""
@@ -60,21 +109,7 @@ class TokenPersistenceError(TokenServiceError):
     """Raised when the token collection cannot be queried or updated."""
 
 
-def _require_pymongo_errors():
-    """Import PyMongo exceptions, raising a helpful message if missing."""
-
-    try:
-        from pymongo.errors import DuplicateKeyError, PyMongoError
-    except ModuleNotFoundError as error:  # pragma: no cover - import guard
-        raise TokenPersistenceError(
-            "The 'pymongo' dependency is required for token storage. "
-            "Install it with `pip install pymongo`."
-        ) from error
-
-    return DuplicateKeyError, PyMongoError
-
-
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TokenMetadata:
     """Persisted information about an API token."""
 
@@ -85,64 +120,312 @@ class TokenMetadata:
     expires_at: Optional[datetime]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CreatedToken(TokenMetadata):
     """Details about a newly created token including its secret value."""
 
     token: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StoredToken(TokenMetadata):
     """Token metadata augmented with the database document identifier."""
 
     id: str
 
 
+@dataclass(slots=True, frozen=True)
+class _CachedToken:
+    """Token metadata kept in memory to skip repeated MongoDB lookups."""
+
+    metadata: TokenMetadata
+    document_id: Any
+    valid_until: float
+
+
+_token_cache = HashLRU(TOKEN_CACHE_MAX_ENTRIES)
+"""Recently validated tokens keyed by their raw SHA-256 digest."""
+
+_rejected_tokens = HashLRU(REJECTED_TOKEN_CACHE_MAX_ENTRIES)
+"""Monotonic deadlines for recently rejected token digests."""
+
+
+def _remaining_lifetime(expires_at: Optional[datetime], now: datetime) -> Optional[float]:
+    """Return the seconds left before ``expires_at``, or ``None`` when it never expires."""
+
+    if expires_at is None:
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return (expires_at - now).total_seconds()
+
+
+def _cache_deadline(remaining: Optional[float]) -> Optional[float]:
+    """Return the ``time.monotonic`` deadline for caching a token, if it may be cached.
+
+    Entries live for ``TOKEN_CACHE_TTL_SECONDS`` but never longer than the
+    token's ``remaining`` lifetime; ``None`` means the token must not be cached.
+    """
+
+    ttl = get_settings().token_cache_ttl_seconds
+    if remaining is not None:
+        ttl = min(ttl, remaining)
+    if ttl <= 0:
+        return None
+    return time.monotonic() + ttl
+
+
+def _reject_token(digest: bytes) -> NoReturn:
+    """Remember ``digest`` as invalid for ``REJECTED_TOKEN_TTL_SECONDS`` and raise."""
+
+    _rejected_tokens.set(digest, time.monotonic() + REJECTED_TOKEN_TTL_SECONDS)
+    raise TokenNotFoundError("Invalid API token.")
+
+
+def _is_recently_rejected(digest: bytes) -> bool:
+    """Return ``True`` while ``digest`` is within its rejection window."""
+
+    rejected_until = _rejected_tokens.get(digest)
+    if rejected_until is None:
+        return False
+    if time.monotonic() >= rejected_until:
+        _rejected_tokens.remove(digest)
+        return False
+    return True
+
+
+def _get_cached_token(digest: bytes) -> Optional[_CachedToken]:
+    """Return the cached entry for ``digest`` while it is still usable."""
+
+    cached = _token_cache.get(digest)
+    if cached is None:
+        return None
+
+    if time.monotonic() >= cached.valid_until:
+        _token_cache.remove(digest)
+        return None
+
+    return cached
+
+
+def _token_digest(token: str) -> bytes:
+    """Return the raw SHA-256 digest for ``token``."""
+
+    return _sha256(token.encode("utf-8")).digest()
+
+
 def _hash_token(token: str) -> str:
-    """Return the SHA-256 hash for ``token``."""
+    """Return the SHA-256 hash for ``token`` as persisted in MongoDB."""
 
-    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return _token_digest(token).hex()
 
 
-async def fetch_token_metadata(token: str) -> TokenMetadata:
-    """Retrieve token metadata for ``token``.
+def digest_token(token: str) -> bytes:
+    """Return the raw SHA-256 digest of ``token`` for constant-time comparisons.
 
-    Updates the ``last_used_at`` field upon successful retrieval.
+    Comparing digests rather than raw strings keeps the expected token's length
+    from leaking through timing.
     """
 
-    token_hash = _hash_token(token)
+    return _token_digest(token)
 
-    try:
-        document, collection = await mongo_manager.find_token_document(token_hash)
-    except MongoConnectionError as error:  # pragma: no cover - sanity guard
-        raise TokenPersistenceError("Token storage is not available.") from error
 
-    if document is None:
-        raise TokenNotFoundError("Invalid API token.")
-
-    metadata = TokenMetadata(
-        database=document["database"],
-        description=document.get("description"),
-        created_at=document["created_at"],
-        last_used_at=document.get("last_used_at"),
-        expires_at=document.get("expires_at"),
-    )
+class CoarseClock:
+    """UTC wall clock refreshed by a background tick instead of on every read.
 
-    _, PyMongoError = _require_pymongo_errors()
+    Until :meth:`start` runs (or after :meth:`stop`), :meth:`now` falls back to
+    ``datetime.now``, so the clock is always safe to call.
+    """
 
-    try:
-        await collection.update_one(
-            {"_id": document["_id"]},
-            {"$set": {"last_used_at": datetime.now(timezone.utc)}},
+    def __init__(self, tick_seconds: float = COARSE_CLOCK_TICK_SECONDS) -> None:
+        self._tick_seconds = tick_seconds
+        self._now: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def now(self) -> datetime:
+        """Return the last ticked UTC time, or the precise time when not running."""
+
+        return self._now or datetime.now(timezone.utc)
+
+    async def _run(self) -> None:
+        while True:
+            self._now = datetime.now(timezone.utc)
+            await asyncio.sleep(self._tick_seconds)
+
+    def start(self) -> None:
+        """Start ticking on the running event loop."""
+
+        if self._task is None or self._task.done():
+            self._now = datetime.now(timezone.utc)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the tick task and return to precise timestamps."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._now = None
+
+
+token_clock = CoarseClock()
+"""Clock used for token usage stamps; ticked only when ``TOKEN_CLOCK_COARSE`` is set."""
+
+
+class TokenUsageRecorder:
+    """Coalesce ``last_used_at`` stamps into periodic ``bulk_write`` batches."""
+
+    def __init__(self, interval_seconds: float = LAST_USED_FLUSH_INTERVAL_SECONDS) -> None:
+        self._interval_seconds = interval_seconds
+        self._pending: Dict[str, Dict[Any, datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, database: str, document_id: Any, used_at: datetime) -> None:
+        """Queue a usage stamp; the latest stamp per token wins."""
+
+        self._pending.setdefault(database, {})[document_id] = used_at
+
+    async def flush(self) -> None:
+        """Persist queued usage stamps with one unordered ``bulk_write`` per database."""
+
+        if not self._pending:
+            return
+
+        if not _PYMONGO_AVAILABLE:  # pragma: no cover - import guard
+            logger.warning("Discarding API token usage stamps: pymongo is not installed.")
+            self._pending = {}
+            return
+
+        pending, self._pending = self._pending, {}
+        for database, stamps in pending.items():
+            operations = [
+                UpdateOne({"_id": document_id}, {"$set": {"last_used_at": used_at}})
+                for document_id, used_at in stamps.items()
+            ]
+            try:
+                collection = await mongo_manager.get_token_collection_for_database(database)
+                await collection.bulk_write(operations, ordered=False)
+            except (MongoConnectionError, PyMongoError) as error:
+                logger.warning(
+                    "Failed to update last usage timestamp for %d API tokens in %s: %s",
+                    len(operations),
+                    database,
+                    error,
+                )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_seconds)
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001 - a failed flush must not end the loop
+                logger.exception("Flushing API token usage stamps failed")
+
+    def start(self) -> None:
+        """Start the periodic flush task on the running event loop."""
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic task and persist any remaining stamps."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:  # noqa: BLE001 - shutdown must continue past a crashed task
+                logger.exception("API token usage recorder ended with an error")
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:  # noqa: BLE001 - shutdown must continue past a failed flush
+            logger.exception("Flushing API token usage stamps failed")
+
+
+token_usage_recorder = TokenUsageRecorder()
+"""Singleton recorder batching ``last_used_at`` updates."""
+
+
+async def _resolve_token(digest: bytes) -> TokenMetadata:
+    """Validate a token by its ``digest`` via the cache or MongoDB and queue its usage stamp."""
+
+    now = token_clock.now()
+
+    cached = _get_cached_token(digest)
+    if cached is not None:
+        metadata = cached.metadata
+        document_id = cached.document_id
+    else:
+        if _is_recently_rejected(digest):
+            raise TokenNotFoundError("Invalid API token.")
+
+        try:
+            document, _ = await mongo_manager.find_token_document(
+                digest.hex(), projection=_TOKEN_METADATA_PROJECTION
+            )
+        except MongoConnectionError as error:  # pragma: no cover - sanity guard
+            raise TokenPersistenceError("Token storage is not available.") from error
+
+        if document is None:
+            _reject_token(digest)
+
+        metadata = TokenMetadata(
+            database=document["database"],
+            description=document.get("description"),
+            created_at=document["created_at"],
+            last_used_at=document.get("last_used_at"),
+            expires_at=document.get("expires_at"),
         )
-    except PyMongoError as error:
-        logger.exception("Failed to update token last usage timestamp: %s", error)
-        raise TokenPersistenceError("Unable to update token usage timestamp.") from error
+        remaining = _remaining_lifetime(metadata.expires_at, now)
+        if remaining is not None and remaining <= 0:
+            _reject_token(digest)
+
+        document_id = document["_id"]
+        valid_until = _cache_deadline(remaining)
+        if valid_until is not None:
+            _token_cache.set(
+                digest,
+                _CachedToken(metadata=metadata, document_id=document_id, valid_until=valid_until),
+            )
+
+    token_usage_recorder.record(metadata.database, document_id, now)
 
     return metadata
 
 
+async def fetch_token_metadata(token: str) -> TokenMetadata:
+    """Retrieve token metadata for ``token``.
+
+    Recently validated tokens are served from an in-process cache for up to
+    ``TOKEN_CACHE_TTL_SECONDS`` (and never past ``expires_at``); unknown tokens
+    are rejected without querying MongoDB for ``REJECTED_TOKEN_TTL_SECONDS``.
+    Successful lookups queue a ``last_used_at`` update that
+    :data:`token_usage_recorder` persists in batches.
+    """
+
+    return await _resolve_token(_token_digest(token))
+
+
+async def fetch_token_database(token: str, digest: Optional[bytes] = None) -> str:
+    """Return only the database bound to ``token``, as needed for authentication.
+
+    Shares the cache and usage tracking of :func:`fetch_token_metadata`. Callers
+    that already hold the :func:`digest_token` value pass it as ``digest`` so the
+    token is not hashed again.
+    """
+
+    if digest is None:
+        digest = _token_digest(token)
+    return (await _resolve_token(digest)).database
+
+
 async def create_token(
     *,
     database: str,
@@ -167,8 +450,9 @@ async def create_token(
     except MongoConnectionError as error:  # pragma: no cover - sanity guard
         raise TokenPersistenceError("Token storage is not available.") from error
 
-    token_secret = token_value or secrets.token_hex(token_length // 2)
-    token_hash = _hash_token(token_secret)
+    token_secret = token_value or os.urandom(token_length // 2).hex()
+    digest = _token_digest(token_secret)
+    token_hash = digest.hex()
     now = datetime.now(timezone.utc)
     expires_at = (
         now + timedelta(seconds=ttl)
@@ -187,7 +471,6 @@ async def create_token(
     if expires_at is not None:
         document["expires_at"] = expires_at
 
-    DuplicateKeyError, PyMongoError = _require_pymongo_errors()
     try:
         await collection.insert_one(document)
     except DuplicateKeyError as error:
@@ -197,6 +480,7 @@ async def create_token(
         raise TokenPersistenceError("Unable to store the new API token.") from error
 
     mongo_manager.remember_token_location(token_hash, database)
+    _rejected_tokens.remove(digest)
 
     return CreatedToken(
         token=token_secret,
@@ -208,21 +492,19 @@ async def create_token(
     )
 
 
-async def list_tokens(database: Optional[str] = None) -> List[StoredToken]:
-    """Return metadata for every stored token, optionally scoped to a database."""
-
-    try:
-        collections = await mongo_manager.iter_token_collections(database)
-    except MongoConnectionError as error:  # pragma: no cover - defensive guard
-        raise TokenPersistenceError("Token storage is not available.") from error
-
-    _, PyMongoError = _require_pymongo_errors()
+async def _list_collection_tokens(
+    database_name: str, collection: Any, semaphore: asyncio.Semaphore
+) -> List[StoredToken]:
+    """Read every stored token from one database's token collection."""
 
     tokens: List[StoredToken] = []
-    for database_name, collection in collections:
+    async with semaphore:
         try:
-            async for document in collection.find():
-                tokens.append(
+            cursor = collection.find({}, projection=_LIST_TOKENS_PROJECTION).batch_size(
+                LIST_TOKENS_BATCH_SIZE
+            )
+            while documents := await cursor.to_list(length=LIST_TOKENS_BATCH_SIZE):
+                tokens += [
                     StoredToken(
                         id=str(document["_id"]),
                         database=database_name,
@@ -231,7 +513,8 @@ async def list_tokens(database: Optional[str] = None) -> List[StoredToken]:
                         last_used_at=document.get("last_used_at"),
                         expires_at=document.get("expires_at"),
                     )
-                )
+                    for document in documents
+                ]
         except PyMongoError as error:
             logger.exception("Failed to list API tokens: %s", error)
             raise TokenPersistenceError("Unable to query stored API tokens.") from error
@@ -239,11 +522,40 @@ async def list_tokens(database: Optional[str] = None) -> List[StoredToken]:
     return tokens
 
 
+async def list_tokens(database: Optional[str] = None) -> List[StoredToken]:
+    """Return metadata for every stored token, optionally scoped to a database."""
+
+    try:
+        collections = await mongo_manager.iter_token_collections(database)
+    except MongoConnectionError as error:  # pragma: no cover - defensive guard
+        raise TokenPersistenceError("Token storage is not available.") from error
+
+    semaphore = asyncio.Semaphore(LIST_TOKENS_CONCURRENCY)
+    try:
+        # The task group cancels the remaining reads as soon as one of them fails.
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(_list_collection_tokens(database_name, collection, semaphore))
+                for database_name, collection in collections
+            ]
+    except* TokenPersistenceError as errors:
+        raise errors.exceptions[0] from None
+
+    return [token for task in tasks for token in task.result()]
+
+
+@lru_cache(maxsize=1024)
+def _parse_object_id(token_id: str) -> ObjectId:
+    """Return the (immutable) ``ObjectId`` for ``token_id``, memoising valid identifiers."""
+
+    return ObjectId(token_id)
+
+
 async def revoke_token(*, database: str, token_id: str) -> None:
     """Delete the token with ``token_id`` persisted inside ``database``."""
 
     try:
-        object_id = ObjectId(token_id)
+        object_id = _parse_object_id(token_id)
     except InvalidId as error:
         raise TokenNotFoundError("Token not found for the requested database.") from error
 
@@ -252,8 +564,6 @@ async def revoke_token(*, database: str, token_id: str) -> None:
     except MongoConnectionError as error:  # pragma: no cover - defensive guard
         raise TokenPersistenceError("Token storage is not available.") from error
 
-    _, PyMongoError = _require_pymongo_errors()
-
     try:
         document = await collection.find_one_and_delete({"_id": object_id})
     except PyMongoError as error:
@@ -265,4 +575,5 @@ async def revoke_token(*, database: str, token_id: str) -> None:
 
     token_hash = document.get("token_hash")
     if token_hash:
+        _token_cache.remove(bytes.fromhex(token_hash))
         mongo_manager.forget_token_location(token_hash)
@@ -0,0 +1,76 @@
+"""In-process caching helpers."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class HashLRU:
+    """Bounded cache implementing the two-generation ``hashlru`` algorithm.
+
+    Entries are written to a *current* generation. Once it holds ``max_size``
+    items it becomes the *previous* generation and a fresh dictionary takes its
+    place, discarding the older one wholesale. Reads that hit the previous
+    generation promote the entry back into the current one, so frequently used
+    keys survive while memory stays bounded at ``2 * max_size`` entries without
+    any per-access bookkeeping.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be greater than 0.")
+        self._max_size = max_size
+        self._size = 0
+        self._current: Dict[Hashable, Any] = {}
+        self._previous: Dict[Hashable, Any] = {}
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._current[key] = value
+        self._size += 1
+        if self._size >= self._max_size:
+            self._size = 0
+            self._previous = self._current
+            self._current = {}
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` when absent."""
+
+        value = self._current.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = self._previous.get(key, _MISSING)
+        if value is not _MISSING:
+            self._store(key, value)
+            return value
+
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache ``value`` under ``key``."""
+
+        if key in self._current:
+            self._current[key] = value
+        else:
+            self._store(key, value)
+
+    def remove(self, key: Hashable) -> None:
+        """Drop ``key`` from both generations."""
+
+        self._current.pop(key, None)
+        self._previous.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+
+        self._size = 0
+        self._current = {}
+        self._previous = {}
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._current or key in self._previous
+
+    def __len__(self) -> int:
+        return len(self._current.keys() | self._previous.keys())
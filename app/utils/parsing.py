@@ -3,16 +3,40 @@
 from __future__ import annotations
 
 import json
+from functools import lru_cache
 from typing import Any
 
+# Characters a JSON document may start with, including the whitespace and the
+# ``NaN``/``Infinity`` literals accepted by :func:`json.loads`.
+_JSON_START_CHARS = frozenset('{["-0123456789tfnNI \t\n\r')
+_JSON_CONTAINER_CHARS = frozenset("{[")
+_BOOLEANS = {"true": True, "false": False}
 
-def coerce_value(value: str) -> Any:
-    """Attempt to coerce a string value into JSON, int, float or bool."""
+
+@lru_cache(maxsize=2048)
+def _coerce_scalar(value: str) -> Any:
+    """Coerce a value that cannot decode to a list or dict; results are immutable."""
+
+    if value[:1] in _JSON_START_CHARS:
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            pass
+    return _BOOLEANS.get(value.lower(), value)
+
+
+def _coerce_complex(value: str) -> Any:
+    """Coerce a possible JSON array or object; never cached since results are mutable."""
 
     try:
         return json.loads(value)
-    except (TypeError, json.JSONDecodeError):
-        lowered = value.lower()
-        if lowered in {"true", "false"}:
-            return lowered == "true"
+    except json.JSONDecodeError:
         return value
+
+
+def coerce_value(value: str) -> Any:
+    """Attempt to coerce a string value into JSON, int, float or bool."""
+
+    if value.lstrip()[:1] in _JSON_CONTAINER_CHARS:
+        return _coerce_complex(value)
+    return _coerce_scalar(value)
@@ -7,9 +7,10 @@ PORT="${UVICORN_PORT:-8000}"
 APP_MODULE="${APP_MODULE:-app.main:app}"
 ENVIRONMENT="${ENVIRONMENT:-production}"
 WORKERS="${UVICORN_WORKERS:-4}"
+LOOP="${UVICORN_LOOP:-uvloop}"
 
 if [ "$ENVIRONMENT" = "development" ]; then
-  exec uvicorn "$APP_MODULE" --host "$HOST" --port "$PORT" --reload
+  exec uvicorn "$APP_MODULE" --host "$HOST" --port "$PORT" --loop "$LOOP" --reload
 else
-  exec uvicorn "$APP_MODULE" --host "$HOST" --port "$PORT" --workers "$WORKERS"
+  exec uvicorn "$APP_MODULE" --host "$HOST" --port "$PORT" --loop "$LOOP" --workers "$WORKERS"
 fi
@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import importlib.util
+import inspect
 import os
 import sys
 import types
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from types import SimpleNamespace
-from typing import Iterator
+from typing import Any, AsyncIterator, Callable, Iterator
+from unittest.mock import call
 
 import pytest
 
@@ -24,6 +27,117 @@ os.environ.setdefault("SHOW_TOKEN_CREATION_ROUTE", "true")
 os.environ.setdefault("API_TOKENS_COLLECTION", "test_api_tokens")
 
 
+_UVLOOP_AVAILABLE = sys.platform != "win32" and importlib.util.find_spec("uvloop") is not None
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Register the custom markers used by the test-suite."""
+
+    config.addinivalue_line(
+        "markers",
+        "settings(**overrides): override attributes of the fake settings served to the code under test.",
+    )
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> tuple[str, dict[str, bool]]:
+    """Run every anyio-marked test on the asyncio backend, resolved once per session.
+
+    The suite runs on uvloop, matching ``start.sh``, wherever it is installed.
+    Set ``TEST_EVENT_LOOP=asyncio`` to fall back to the stock event loop.
+    """
+
+    default_loop = "uvloop" if _UVLOOP_AVAILABLE else "asyncio"
+    return "asyncio", {"use_uvloop": os.environ.get("TEST_EVENT_LOOP", default_loop) == "uvloop"}
+
+
+@pytest.fixture(scope="session")
+async def _shared_anyio_runner() -> AsyncIterator[None]:
+    """Hold anyio's test runner open so every anyio test shares one event loop."""
+
+    yield
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Request the shared runner from anyio tests only, leaving synchronous tests untouched."""
+
+    for item in items:
+        if (
+            isinstance(item, pytest.Function)
+            and item.get_closest_marker("anyio") is not None
+            and inspect.iscoroutinefunction(item.obj)
+        ):
+            item.fixturenames.append("_shared_anyio_runner")
+
+
+async def _noop(*args: Any, **kwargs: Any) -> None:
+    return None
+
+
+async def _fake_get_collection(database_name: str) -> object:
+    return object()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _stub_mongo() -> Iterator[None]:
+    """Keep the shared ``mongo_manager`` away from MongoDB for the whole session.
+
+    Tests that exercise these methods patch them again with their own stand-ins.
+    """
+
+    from app.db.mongo import mongo_manager
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(mongo_manager, "connect", _noop)
+        mp.setattr(mongo_manager, "close", _noop)
+        mp.setattr(mongo_manager, "get_timeseries_collection_for_database", _fake_get_collection)
+        yield
+
+
+@pytest.fixture(scope="session")
+async def asgi_client() -> AsyncIterator[Any]:
+    """Serve the application in-process through one HTTP client for the whole session.
+
+    The app lifespan is not run, so route tests never reach MongoDB. Fixtures that
+    add headers for a test are expected to remove them afterwards.
+    """
+
+    from httpx import ASGITransport, AsyncClient
+
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+class AsyncRecorder:
+    """Cheap awaitable stand-in for ``AsyncMock`` that records calls and returns a fixed value.
+
+    Only the ``await_args_list``/``await_count`` attributes and the two assertion
+    helpers used by the suite are provided.
+    """
+
+    __slots__ = ("await_args_list", "return_value")
+
+    def __init__(self, return_value: Any = None) -> None:
+        self.await_args_list: list[Any] = []
+        self.return_value = return_value
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.await_args_list.append(call(*args, **kwargs))
+        return self.return_value
+
+    @property
+    def await_count(self) -> int:
+        return len(self.await_args_list)
+
+    def assert_not_awaited(self) -> None:
+        assert self.await_args_list == [], self.await_args_list
+
+    def assert_awaited_once_with(self, *args: Any, **kwargs: Any) -> None:
+        assert self.await_args_list == [call(*args, **kwargs)], self.await_args_list
+
+
 @dataclass
 class FakePyMongo:
     """Container exposing stand-ins for the optional ``pymongo`` dependency."""
@@ -37,12 +151,17 @@ class FakePyMongo:
     DuplicateKeyError: type[Exception]
     CollectionInvalid: type[Exception]
     ServerSelectionTimeoutError: type[Exception]
+    ExecutionTimeout: type[Exception]
     ReturnDocument: SimpleNamespace
 
 
-@pytest.fixture()
-def fake_pymongo(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakePyMongo]:
-    """Provide lightweight ``pymongo`` stand-ins for environments without the dependency."""
+@pytest.fixture(scope="session")
+def fake_pymongo_module() -> FakePyMongo:
+    """Build the ``pymongo`` stand-in modules once for the whole test session.
+
+    Tests that only need the stand-in types, without installing them into
+    ``sys.modules``, can request this fixture instead of ``fake_pymongo``.
+    """
 
     module = types.ModuleType("pymongo")
     errors = types.ModuleType("pymongo.errors")
@@ -62,21 +181,22 @@ def fake_pymongo(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakePyMongo]:
     class _ServerSelectionTimeoutError(_PyMongoError):
         """Error raised when connecting to MongoDB times out."""
 
+    class _ExecutionTimeout(_OperationFailure):
+        """Error raised when an operation exceeds its ``maxTimeMS``."""
+
     errors.PyMongoError = _PyMongoError
     errors.OperationFailure = _OperationFailure
     errors.DuplicateKeyError = _DuplicateKeyError
     errors.CollectionInvalid = _CollectionInvalid
     errors.ServerSelectionTimeoutError = _ServerSelectionTimeoutError
+    errors.ExecutionTimeout = _ExecutionTimeout
 
     module.ASCENDING = 1
     module.DESCENDING = -1
     module.ReturnDocument = SimpleNamespace(AFTER="after")
     module.errors = errors
 
-    monkeypatch.setitem(sys.modules, "pymongo", module)
-    monkeypatch.setitem(sys.modules, "pymongo.errors", errors)
-
-    yield FakePyMongo(
+    return FakePyMongo(
         module=module,
         errors=errors,
         ASCENDING=module.ASCENDING,
@@ -86,5 +206,128 @@ def fake_pymongo(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakePyMongo]:
         DuplicateKeyError=_DuplicateKeyError,
         CollectionInvalid=_CollectionInvalid,
         ServerSelectionTimeoutError=_ServerSelectionTimeoutError,
+        ExecutionTimeout=_ExecutionTimeout,
         ReturnDocument=module.ReturnDocument,
     )
+
+
+@pytest.fixture()
+def fake_pymongo(
+    monkeypatch: pytest.MonkeyPatch, fake_pymongo_module: FakePyMongo
+) -> Iterator[FakePyMongo]:
+    """Provide lightweight ``pymongo`` stand-ins for environments without the dependency."""
+
+    monkeypatch.setitem(sys.modules, "pymongo", fake_pymongo_module.module)
+    monkeypatch.setitem(sys.modules, "pymongo.errors", fake_pymongo_module.errors)
+
+    yield fake_pymongo_module
+
+
+class FakeMotorClient:
+    """Stand-in for ``motor.motor_asyncio.AsyncIOMotorClient`` that never opens a connection."""
+
+    def __init__(self, uri: str, **kwargs: Any) -> None:
+        self.uri = uri
+        self.kwargs = kwargs
+        self.closed = False
+
+    async def server_info(self) -> dict[str, str]:
+        return {"version": "mock"}
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture(scope="session")
+def _fake_motor_session() -> tuple[types.ModuleType, types.ModuleType]:
+    """Build the ``motor`` stand-in modules once for the whole test session."""
+
+    motor_asyncio = types.ModuleType("motor.motor_asyncio")
+    motor_asyncio.AsyncIOMotorClient = FakeMotorClient
+    motor = types.ModuleType("motor")
+    motor.motor_asyncio = motor_asyncio
+    return motor, motor_asyncio
+
+
+@pytest.fixture()
+def fake_motor(
+    monkeypatch: pytest.MonkeyPatch,
+    _fake_motor_session: tuple[types.ModuleType, types.ModuleType],
+) -> Iterator[type[FakeMotorClient]]:
+    """Route ``motor`` imports to :class:`FakeMotorClient` for the duration of a test."""
+
+    motor, motor_asyncio = _fake_motor_session
+    monkeypatch.setitem(sys.modules, "motor", motor)
+    monkeypatch.setitem(sys.modules, "motor.motor_asyncio", motor_asyncio)
+
+    yield FakeMotorClient
+
+
+@dataclass
+class FakeCollection:
+    """Typed stand-in for a Motor collection with canned results and recorded calls.
+
+    Each ``<method>_result`` is returned by the matching coroutine, or raised when
+    it is an exception instance. Calls are appended to ``<method>_calls``.
+    """
+
+    find_one_result: Any = None
+    insert_one_result: Any = None
+    replace_one_result: Any = None
+    delete_one_result: Any = None
+    find_one_and_update_result: Any = None
+    estimated_document_count_result: Any = 0
+    count_documents_result: Any = 0
+    full_name: str = "tests.collection"
+    find_one_calls: list[Any] = field(default_factory=list)
+    insert_one_calls: list[Any] = field(default_factory=list)
+    replace_one_calls: list[Any] = field(default_factory=list)
+    delete_one_calls: list[Any] = field(default_factory=list)
+    find_one_and_update_calls: list[Any] = field(default_factory=list)
+    estimated_document_count_calls: list[Any] = field(default_factory=list)
+    count_documents_calls: list[Any] = field(default_factory=list)
+
+    @staticmethod
+    def _respond(calls: list[Any], result: Any, *args: Any, **kwargs: Any) -> Any:
+        calls.append(call(*args, **kwargs))
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    async def find_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(self.find_one_calls, self.find_one_result, *args, **kwargs)
+
+    async def insert_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(self.insert_one_calls, self.insert_one_result, *args, **kwargs)
+
+    async def replace_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(self.replace_one_calls, self.replace_one_result, *args, **kwargs)
+
+    async def delete_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(self.delete_one_calls, self.delete_one_result, *args, **kwargs)
+
+    async def find_one_and_update(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(
+            self.find_one_and_update_calls, self.find_one_and_update_result, *args, **kwargs
+        )
+
+    async def estimated_document_count(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(
+            self.estimated_document_count_calls, self.estimated_document_count_result, *args, **kwargs
+        )
+
+    async def count_documents(self, *args: Any, **kwargs: Any) -> Any:
+        return self._respond(self.count_documents_calls, self.count_documents_result, *args, **kwargs)
+
+
+@pytest.fixture()
+def make_collection() -> Callable[..., FakeCollection]:
+    """Return a factory for collections whose ``insert_one`` reports ``inserted_id``."""
+
+    def _make(find_one: Any = None, inserted_id: Any = "abc123") -> FakeCollection:
+        return FakeCollection(
+            find_one_result=find_one,
+            insert_one_result=SimpleNamespace(inserted_id=inserted_id),
+        )
+
+    return _make
@@ -2,35 +2,54 @@
 
 from __future__ import annotations
 
-from types import SimpleNamespace
+from datetime import datetime, timezone
 from typing import Any
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
-from fastapi import HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
 
+from app.core.config import get_settings
 from app.dependencies import (
     TokenContext,
+    _BEARER_PATTERN,
     _extract_bearer_token,
     get_timeseries_collection,
     get_token_context,
     require_admin_context,
 )
+from app.services import tokens
 from app.services.tokens import TokenNotFoundError, TokenPersistenceError
 
 
-def _mock_settings(**overrides: Any) -> Any:
-    defaults = {
-        "api_admin_token": "admin-token",
-    }
-    defaults.update(overrides)
-    return SimpleNamespace(**defaults)
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch: pytest.MonkeyPatch) -> str:
+    """Use a known administrator token regardless of the environment."""
 
+    monkeypatch.setattr("app.dependencies._ADMIN_TOKEN_DIGEST", tokens.digest_token("admin-token"))
+    return "admin-token"
 
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Run anyio-based tests using the asyncio backend."""
 
-    return "asyncio"
+def test_get_settings_returns_one_immutable_instance() -> None:
+    """Settings are parsed once and cannot be mutated by request-time code."""
+
+    settings = get_settings()
+
+    assert get_settings() is settings
+    with pytest.raises(ValidationError):
+        settings.api_admin_token = "changed"
+
+
+def test_token_context_is_immutable_and_slotted() -> None:
+    """Token contexts are created per request, so they should stay small and read-only."""
+
+    context = TokenContext(token="token", database_name="metrics", is_admin=False)
+
+    assert not hasattr(context, "__dict__")
+    with pytest.raises(AttributeError):
+        context.is_admin = True  # type: ignore[misc]
 
 
 def test_extract_bearer_token_happy_path() -> None:
@@ -39,6 +58,26 @@ def test_extract_bearer_token_happy_path() -> None:
     assert _extract_bearer_token("Bearer secret") == "secret"
 
 
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [("bearer secret", "secret"), ("  BEARER \t secret  ", "secret"), ("Bearer two words", "two words")],
+)
+def test_extract_bearer_token_normalises_scheme_and_whitespace(header: str, expected: str) -> None:
+    """The scheme is case-insensitive and whitespace around the credentials is ignored."""
+
+    assert _extract_bearer_token(header) == expected
+
+
+@pytest.mark.parametrize("header", ["Bearer secret  ", "Bearer secret\n", "bearer \t secret \r\n"])
+def test_bearer_pattern_trims_credentials_without_caller_stripping(header: str) -> None:
+    """The captured group excludes trailing whitespace even when the header is not stripped."""
+
+    match = _BEARER_PATTERN.fullmatch(header)
+
+    assert match is not None
+    assert match.group(1) == "secret"
+
+
 @pytest.mark.parametrize(
     "header",
     [None, "", "Token secret", "Bearer   "],
@@ -52,11 +91,9 @@ def test_extract_bearer_token_rejects_invalid_headers(header: str | None) -> Non
 
 
 @pytest.mark.anyio
-async def test_get_token_context_for_admin(monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_get_token_context_for_admin() -> None:
     """Supplying the administrator token should skip metadata lookups."""
 
-    monkeypatch.setattr("app.dependencies.get_settings", lambda: _mock_settings())
-
     context = await get_token_context(
         authorization="Bearer admin-token",
         database_override="analytics",
@@ -66,17 +103,45 @@ async def test_get_token_context_for_admin(monkeypatch: pytest.MonkeyPatch) -> N
 
 
 @pytest.mark.anyio
-async def test_get_token_context_for_regular_token(monkeypatch: pytest.MonkeyPatch) -> None:
-    """Regular tokens should be resolved via the metadata helper."""
+async def test_get_token_context_rejects_empty_bearer_without_admin_token(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """An unset administrator token must not let a bare ``Bearer`` header through."""
+
+    monkeypatch.setattr("app.dependencies._ADMIN_TOKEN_DIGEST", tokens.digest_token(""))
+
+    with pytest.raises(HTTPException) as excinfo:
+        await get_token_context(authorization="Bearer ", database_override=None)
+
+    assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("token", ["admin-tok", "admin-token-extra", "ADMIN-TOKEN"])
+async def test_get_token_context_rejects_admin_lookalikes(monkeypatch: pytest.MonkeyPatch, token: str) -> None:
+    """Tokens sharing a prefix with the administrator token must not be treated as admin."""
+
+    async def fake_fetch(candidate: str, digest: bytes | None = None) -> Any:
+        assert candidate == token
+        return "metrics"
+
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
 
-    settings = _mock_settings()
-    monkeypatch.setattr("app.dependencies.get_settings", lambda: settings)
+    context = await get_token_context(authorization=f"Bearer {token}", database_override=None)
 
-    async def fake_fetch(token: str) -> Any:
+    assert context.is_admin is False
+
+
+@pytest.mark.anyio
+async def test_get_token_context_for_regular_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Regular tokens should be resolved via the token database helper."""
+
+    async def fake_fetch(token: str, digest: bytes | None = None) -> Any:
         assert token == "user-token"
-        return SimpleNamespace(database="metrics")
+        assert digest == tokens.digest_token("user-token")
+        return "metrics"
 
-    monkeypatch.setattr("app.dependencies.fetch_token_metadata", fake_fetch)
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
 
     context = await get_token_context(
         authorization="Bearer user-token",
@@ -86,16 +151,66 @@ async def test_get_token_context_for_regular_token(monkeypatch: pytest.MonkeyPat
     assert context == TokenContext(token="user-token", database_name="metrics", is_admin=False)
 
 
+@pytest.mark.anyio
+async def test_get_token_context_caches_token_lookups(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Repeated requests with the same token should hit MongoDB only once."""
+
+    manager = MagicMock()
+    manager.find_token_document = AsyncMock(
+        return_value=(
+            {"_id": "id", "database": "metrics", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+            None,
+        )
+    )
+    monkeypatch.setattr(tokens, "mongo_manager", manager)
+    monkeypatch.setattr(tokens, "token_usage_recorder", tokens.TokenUsageRecorder())
+    tokens._token_cache.clear()
+
+    for _ in range(3):
+        context = await get_token_context(authorization="Bearer user-token", database_override=None)
+        assert context.database_name == "metrics"
+
+    assert manager.find_token_document.await_count == 1
+    tokens._token_cache.clear()
+
+
+def test_token_context_is_resolved_once_per_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Nested dependencies on ``get_token_context`` should share one resolution."""
+
+    calls: list[str] = []
+
+    async def fake_fetch(token: str, digest: bytes | None = None) -> Any:
+        calls.append(token)
+        return "metrics"
+
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
+
+    async def nested(context: TokenContext = Depends(get_token_context)) -> str:
+        return context.database_name
+
+    app = FastAPI()
+
+    @app.get("/probe")
+    async def probe(
+        context: TokenContext = Depends(get_token_context),
+        database: str = Depends(nested),
+    ) -> dict[str, str]:
+        return {"database": database}
+
+    response = TestClient(app).get("/probe", headers={"Authorization": "Bearer user-token"})
+
+    assert response.json() == {"database": "metrics"}
+    assert calls == ["user-token"]
+
+
 @pytest.mark.anyio
 async def test_get_token_context_rejects_invalid_token(monkeypatch: pytest.MonkeyPatch) -> None:
     """Invalid tokens should yield a 401 HTTP error."""
 
-    monkeypatch.setattr("app.dependencies.get_settings", lambda: _mock_settings())
-
-    async def fake_fetch(token: str) -> Any:
+    async def fake_fetch(token: str, digest: bytes | None = None) -> Any:
         raise TokenNotFoundError("Invalid API token.")
 
-    monkeypatch.setattr("app.dependencies.fetch_token_metadata", fake_fetch)
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
 
     with pytest.raises(HTTPException) as excinfo:
         await get_token_context(authorization="Bearer bad-token", database_override=None)
@@ -106,12 +221,10 @@ async def test_get_token_context_rejects_invalid_token(monkeypatch: pytest.Monke
 async def test_get_token_context_handles_persistence_errors(monkeypatch: pytest.MonkeyPatch) -> None:
     """Failures talking to MongoDB should surface as 503 responses."""
 
-    monkeypatch.setattr("app.dependencies.get_settings", lambda: _mock_settings())
-
-    async def fake_fetch(token: str) -> Any:
+    async def fake_fetch(token: str, digest: bytes | None = None) -> Any:
         raise TokenPersistenceError("storage down")
 
-    monkeypatch.setattr("app.dependencies.fetch_token_metadata", fake_fetch)
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
 
     with pytest.raises(HTTPException) as excinfo:
         await get_token_context(authorization="Bearer token", database_override=None)
@@ -122,12 +235,10 @@ async def test_get_token_context_handles_persistence_errors(monkeypatch: pytest.
 async def test_get_token_context_rejects_database_override(monkeypatch: pytest.MonkeyPatch) -> None:
     """Tokens must not be able to access a different database than configured."""
 
-    monkeypatch.setattr("app.dependencies.get_settings", lambda: _mock_settings())
-
-    async def fake_fetch(token: str) -> Any:
-        return SimpleNamespace(database="metrics")
+    async def fake_fetch(token: str, digest: bytes | None = None) -> Any:
+        return "metrics"
 
-    monkeypatch.setattr("app.dependencies.fetch_token_metadata", fake_fetch)
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch)
 
     with pytest.raises(HTTPException) as excinfo:
         await get_token_context(authorization="Bearer token", database_override="other")
@@ -164,32 +275,26 @@ class _DummyManager:
 
 @pytest.mark.anyio
 async def test_get_timeseries_collection_happy_path(monkeypatch: pytest.MonkeyPatch) -> None:
-    """A valid context should yield a collection from the manager."""
+    """A valid context should resolve a collection from the manager."""
 
     dummy_collection = object()
     manager = _DummyManager(dummy_collection)
     monkeypatch.setattr("app.dependencies.mongo_manager", manager)
 
     context = TokenContext(token="token", database_name="metrics", is_admin=False)
-    dependency = get_timeseries_collection(context)
-    collection = await dependency.__anext__()
+    collection = await get_timeseries_collection(context)
 
     assert collection is dummy_collection
     assert manager.called_with == ["metrics"]
 
-    with pytest.raises(StopAsyncIteration):
-        await dependency.__anext__()
-
 
 @pytest.mark.anyio
 async def test_get_timeseries_collection_requires_database() -> None:
     """The dependency should enforce specifying a database for non-admin tokens."""
 
     context = TokenContext(token="token", database_name=None, is_admin=False)
-    generator = get_timeseries_collection(context)
-
     with pytest.raises(HTTPException) as excinfo:
-        await generator.__anext__()
+        await get_timeseries_collection(context)
     assert excinfo.value.status_code == status.HTTP_400_BAD_REQUEST
 
 
@@ -204,8 +309,6 @@ async def test_get_timeseries_collection_handles_connection_error(monkeypatch: p
     monkeypatch.setattr("app.dependencies.mongo_manager", manager)
 
     context = TokenContext(token="token", database_name="metrics", is_admin=False)
-    generator = get_timeseries_collection(context)
-
     with pytest.raises(HTTPException) as excinfo:
-        await generator.__anext__()
+        await get_timeseries_collection(context)
     assert excinfo.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
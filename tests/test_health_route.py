@@ -3,29 +3,14 @@
 from __future__ import annotations
 
 import pytest
-from fastapi.testclient import TestClient
+from httpx import AsyncClient
 
-from app.main import app
 
-
-@pytest.fixture()
-def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
-    """Provide a test client without hitting real MongoDB connections."""
-
-    async def noop(*args, **kwargs):  # pragma: no cover - trivial coroutine
-        return None
-
-    monkeypatch.setattr("app.main.mongo_manager.connect", noop)
-    monkeypatch.setattr("app.main.mongo_manager.close", noop)
-
-    with TestClient(app) as test_client:
-        yield test_client
-
-
-def test_healthz_returns_ok(client: TestClient) -> None:
+@pytest.mark.anyio
+async def test_healthz_returns_ok(asgi_client: AsyncClient) -> None:
     """Ensure the health-check route returns a positive status."""
 
-    response = client.get("/healthz")
+    response = await asgi_client.get("/healthz")
 
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
@@ -2,22 +2,13 @@
 
 from __future__ import annotations
 
-import importlib
-
 import pytest
-from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from unittest.mock import AsyncMock
 
+from app.core.config import get_settings
 from app.db.mongo import MongoConnectionError
-from app.main import lifespan
-
-
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Execute async tests using asyncio."""
-
-    return "asyncio"
+from app.main import create_app, lifespan
 
 
 @pytest.mark.anyio
@@ -29,7 +20,7 @@ async def test_lifespan_invokes_connect_and_close(monkeypatch: pytest.MonkeyPatc
     monkeypatch.setattr("app.main.mongo_manager.connect", connect)
     monkeypatch.setattr("app.main.mongo_manager.close", close)
 
-    async with lifespan(FastAPI()):
+    async with lifespan(create_app(get_settings())):
         pass
 
     connect.assert_awaited_once()
@@ -46,21 +37,43 @@ async def test_lifespan_propagates_connection_errors(monkeypatch: pytest.MonkeyP
     monkeypatch.setattr("app.main.mongo_manager.close", close)
 
     with pytest.raises(MongoConnectionError):
-        async with lifespan(FastAPI()):
+        async with lifespan(create_app(get_settings())):
             pass
 
     close.assert_not_awaited()
 
 
-def test_app_includes_cors_when_origins(monkeypatch: pytest.MonkeyPatch) -> None:
+@pytest.mark.anyio
+@pytest.mark.parametrize("coarse", [True, False])
+async def test_lifespan_reads_settings_from_the_app(monkeypatch: pytest.MonkeyPatch, coarse: bool) -> None:
+    """``token_clock_coarse`` should come from the settings the app was built with."""
+
+    started: list[bool] = []
+    monkeypatch.setattr("app.main.token_clock.start", lambda: started.append(True))
+
+    settings = get_settings().model_copy(update={"token_clock_coarse": coarse})
+
+    async with lifespan(create_app(settings)):
+        pass
+
+    assert started == ([True] if coarse else [])
+
+
+def test_app_includes_cors_when_origins() -> None:
     """CORS middleware should be added when allowed origins are configured."""
 
-    import app.main as app_main
+    settings = get_settings().model_copy(update={"allowed_origins": ["http://example.com"]})
+
+    application = create_app(settings)
+
+    assert any(m.cls is CORSMiddleware for m in application.user_middleware)
+
+
+def test_app_omits_cors_without_origins() -> None:
+    """No CORS middleware should be installed when no origins are configured."""
+
+    settings = get_settings().model_copy(update={"allowed_origins": []})
+
+    application = create_app(settings)
 
-    monkeypatch.setenv("ALLOWED_ORIGINS", "http://example.com")
-    reloaded = importlib.reload(app_main)
-    try:
-        assert any(m.cls is CORSMiddleware for m in reloaded.app.user_middleware)
-    finally:
-        monkeypatch.delenv("ALLOWED_ORIGINS", raising=False)
-        importlib.reload(reloaded)
+    assert not any(m.cls is CORSMiddleware for m in application.user_middleware)
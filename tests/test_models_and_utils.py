@@ -12,7 +12,8 @@ from app.models.time_series import (
     TimeSeriesRecordUpdate,
 )
 from app.models.tokens import APITokenCreate
-from app.utils.parsing import coerce_value
+from app.utils.cache import HashLRU
+from app.utils.parsing import _coerce_scalar, coerce_value
 
 
 def test_coerce_value_parses_json() -> None:
@@ -35,6 +36,31 @@ def test_coerce_value_returns_original_string() -> None:
     assert coerce_value("not-json") == "not-json"
 
 
+def test_coerce_value_caches_scalars_but_not_containers() -> None:
+    """Repeated scalar strings should hit the cache while containers stay fresh."""
+
+    _coerce_scalar.cache_clear()
+
+    assert coerce_value("42") == 42
+    assert coerce_value("42") == 42
+    assert _coerce_scalar.cache_info().hits == 1
+
+    first = coerce_value("[1]")
+    first.append(2)
+    assert coerce_value("[1]") == [1]
+    assert _coerce_scalar.cache_info().currsize == 1
+
+
+def test_coerce_value_keeps_json_number_semantics() -> None:
+    """Numbers and near-miss JSON prefixes should behave as with ``json.loads``."""
+
+    assert coerce_value("-12") == -12
+    assert coerce_value(" 1.5") == 1.5
+    assert coerce_value("nullable") == "nullable"
+    assert coerce_value("1_000") == "1_000"
+    assert coerce_value("") == ""
+
+
 def test_time_series_create_ttl_validation() -> None:
     """The create payload must reject negative TTL values."""
 
@@ -95,3 +121,37 @@ def test_api_token_create_validators() -> None:
 
     with pytest.raises(ValueError, match="greater than or equal to 0"):
         APITokenCreate(database="db", ttl=-5)
+
+
+def test_hash_lru_promotes_entries_from_previous_generation() -> None:
+    """Entries read from the previous generation should survive the next rotation."""
+
+    cache = HashLRU(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)  # rotates: {"a", "b"} become the previous generation
+
+    assert cache.get("a") == 1  # promoted into the current generation
+    cache.set("c", 3)  # rotates again, dropping "b"
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert "c" in cache
+
+
+def test_hash_lru_remove_and_clear() -> None:
+    """Removal should affect both generations and clear should empty the cache."""
+
+    cache = HashLRU(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    cache.remove("a")
+    assert "a" not in cache
+    assert len(cache) == 2
+
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        HashLRU(max_size=0)
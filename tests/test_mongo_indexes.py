@@ -2,352 +2,434 @@
 
 from __future__ import annotations
 
-import sys
-from datetime import datetime, timedelta, timezone
-from types import SimpleNamespace
-from typing import Any
-from unittest.mock import ANY, AsyncMock, MagicMock, call
+import asyncio
+from datetime import datetime, timezone
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, Awaitable, Callable
+from unittest.mock import AsyncMock, call
 
 import pytest
 
-from app.db.mongo import ASCENDING, MongoConnectionError, MongoDBManager, PyMongoError
-from tests.conftest import FakePyMongo
+from app.db import mongo as mongo_module
+from app.db.mongo import (
+    ASCENDING,
+    MIN_CLEANUP_INTERVAL_SECONDS,
+    TOKEN_HASH_INDEX_HINT,
+    MongoConnectionError,
+    MongoDBManager,
+    PyMongoError,
+)
+from tests.conftest import AsyncRecorder, FakeMotorClient, FakePyMongo
+
+
+# Expected call arguments shared by the assertions below.
+_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_EXPIRED_FILTER = {"expires_at": {"$lte": _NOW}}
+_TIMESERIES_OPTIONS = {"timeField": "timestamp", "metaField": "metadata"}
+
+# Read-only ``index_information`` results shared by the ``_ensure_indexes`` tests.
+_KEY_TS = [("timestamp", ASCENDING)]
+_KEY_EXPIRES_AT = [("expires_at", ASCENDING)]
+_PARTIAL_FILTER = {"metadata": {"$exists": True}}
+_TTL_EXPIRES_AT = {"key": _KEY_EXPIRES_AT, "expireAfterSeconds": 0}
+_IDX_TS_MISSING = MappingProxyType({"_id_": {}})
+_IDX_TS_PLAIN = MappingProxyType({"timestamp_1": {"key": _KEY_TS}})
+_IDX_TS_TTL_LEGACY = MappingProxyType(
+    {
+        "timestamp_1": {
+            "key": _KEY_TS,
+            "expireAfterSeconds": 3600,
+            "partialFilterExpression": _PARTIAL_FILTER,
+        }
+    }
+)
+_IDX_EXPIRES_AT_TTL = MappingProxyType({**_IDX_TS_PLAIN, "expires_at_ttl": _TTL_EXPIRES_AT})
+_IDX_EXPIRES_AT_TTL_600 = MappingProxyType(
+    {**_IDX_TS_PLAIN, "expires_at_ttl": {**_TTL_EXPIRES_AT, "expireAfterSeconds": 600}}
+)
+_IDX_EXPIRES_AT_1 = MappingProxyType({**_IDX_TS_PLAIN, "expires_at_1": _TTL_EXPIRES_AT})
+_IDX_EXPIRES_AT_BOTH = MappingProxyType(
+    {**_IDX_TS_PLAIN, "expires_at_ttl": _TTL_EXPIRES_AT, "expires_at_1": _TTL_EXPIRES_AT}
+)
 
 
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Force the anyio plugin to run tests using the asyncio backend."""
+class _FakeSettings:
+    """Simple container mimicking the relevant application settings.
 
-    return "asyncio"
+    Defaults live on the class; ``@pytest.mark.settings`` overrides shadow them per instance.
+    """
 
+    timeseries_time_field = "timestamp"
+    timeseries_meta_field = "metadata"
+    mongodb_collection = "measurements"
+    api_tokens_collection = "api_tokens"
+    expiration_cleanup_interval_seconds = 300
 
-class _FakeSettings:
-    """Simple container mimicking the relevant application settings."""
 
-    def __init__(self) -> None:
-        self.timeseries_time_field = "timestamp"
-        self.timeseries_meta_field = "metadata"
-        self.mongodb_collection = "measurements"
-        self.api_tokens_collection = "api_tokens"
-        self.expiration_cleanup_interval_seconds = 300
+def _returning(value: Any) -> Callable[..., Awaitable[Any]]:
+    """Build a plain coroutine function stub for reads whose calls are never asserted."""
 
+    async def _stub(*args: Any, **kwargs: Any) -> Any:
+        return value
 
-@pytest.mark.anyio
-async def test_ensure_indexes_recreates_plain_index_when_ttl_present(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure legacy TTL indexes on the time field are replaced."""
+    return _stub
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(
-        return_value={
-            "timestamp_1": {
-                "key": [("timestamp", ASCENDING)],
-                "expireAfterSeconds": 3600,
-                "partialFilterExpression": {"metadata": {"$exists": True}},
-            }
-        }
-    )
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
+def _raising(error: BaseException) -> Callable[..., Awaitable[Any]]:
+    """Build a plain coroutine function stub that raises ``error`` when awaited."""
 
-    await manager._ensure_indexes(collection)
+    async def _stub(*args: Any, **kwargs: Any) -> Any:
+        raise error
 
-    assert collection.drop_index.await_args_list == [call("timestamp_1")]
-    assert collection.create_index.await_args_list == [
-        call([("timestamp", ASCENDING)], name="timestamp_1"),
-    ]
+    return _stub
 
 
-@pytest.mark.anyio
-async def test_ensure_indexes_is_idempotent_with_expected_indexes(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure no action is taken when timestamp and TTL indexes are correct."""
+def _index_collection(existing_indexes: Any = None) -> SimpleNamespace:
+    """Build a collection for ``_ensure_indexes`` that records every index call."""
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(
-        return_value={
-            "timestamp_1": {"key": [("timestamp", ASCENDING)]},
-        }
+    return SimpleNamespace(
+        index_information=AsyncRecorder(existing_indexes),
+        drop_index=AsyncRecorder(),
+        create_index=AsyncRecorder(),
     )
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
 
-    await manager._ensure_indexes(collection)
+def _expiring_collection(deleted_count: int) -> SimpleNamespace:
+    """Build a collection whose ``delete_many`` reports ``deleted_count`` removals."""
 
-    collection.drop_index.assert_not_awaited()
-    collection.create_index.assert_not_awaited()
+    return SimpleNamespace(delete_many=AsyncRecorder(SimpleNamespace(deleted_count=deleted_count)))
 
 
-@pytest.mark.anyio
-async def test_ensure_indexes_creates_missing_timestamp_index(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure the timestamp index is created when absent."""
+class _Database:
+    """Motor database stand-in without collections that serves ``collection`` for any name."""
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(return_value={"_id_": {}})
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
+    def __init__(self, collection: Any, name: str = "analytics") -> None:
+        self.name = name
+        self.list_collection_names = _returning([])
+        self.create_collection = AsyncRecorder()
+        self._collection = collection
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
+    def __getitem__(self, name: str) -> Any:
+        return self._collection
 
-    await manager._ensure_indexes(collection)
 
-    collection.drop_index.assert_not_awaited()
-    assert collection.create_index.await_args_list == [
-        call([("timestamp", ASCENDING)], name="timestamp_1"),
-    ]
+# Stateless database stub exposing the default token collection.
+_TOKEN_DATABASE = SimpleNamespace(list_collection_names=_returning([_FakeSettings.api_tokens_collection]))
 
 
-@pytest.mark.anyio
-async def test_ensure_indexes_drops_incorrect_ttl_index(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure TTL indexes with wrong settings are removed."""
+class _TokenClient:
+    """Motor client stand-in listing ``names``, each of which holds a token collection."""
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(
-        return_value={
-            "timestamp_1": {"key": [("timestamp", ASCENDING)]},
-            "expires_at_ttl": {
-                "key": [("expires_at", ASCENDING)],
-                "expireAfterSeconds": 600,
-            },
-        }
-    )
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
+    def __init__(self, *names: str) -> None:
+        self._names = list(names)
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
+    async def list_database_names(self) -> list[str]:
+        return self._names
 
-    await manager._ensure_indexes(collection)
+    def __getitem__(self, name: str) -> SimpleNamespace:
+        return _TOKEN_DATABASE
 
-    assert collection.drop_index.await_args_list == [call("expires_at_ttl")]
-    assert collection.create_index.await_args_list == []
 
+@pytest.fixture()
+def fake_settings(request: pytest.FixtureRequest) -> _FakeSettings:
+    """Provide the settings returned by ``get_settings``, applying ``@pytest.mark.settings`` overrides."""
 
-@pytest.mark.anyio
-async def test_ensure_indexes_drops_ttl_missing_partial_filter(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure TTL indexes without the expected partial filter are removed."""
+    settings = _FakeSettings()
+    marker = request.node.get_closest_marker("settings")
+    if marker is not None:
+        for name, value in marker.kwargs.items():
+            setattr(settings, name, value)
+    return settings
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(
-        return_value={
-            "timestamp_1": {"key": [("timestamp", ASCENDING)]},
-            "expires_at_ttl": {
-                "key": [("expires_at", ASCENDING)],
-                "expireAfterSeconds": 0,
-            },
-        }
-    )
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
+@pytest.fixture(autouse=True)
+def _patch_settings(monkeypatch: pytest.MonkeyPatch, fake_settings: _FakeSettings) -> None:
+    """Serve ``fake_settings`` to the MongoDB manager instead of the environment."""
+
+    monkeypatch.setattr(mongo_module, "get_settings", lambda: fake_settings)
+
+
+@pytest.fixture()
+def manager() -> MongoDBManager:
+    """Provide a fresh manager pinned to ``_NOW``; its caches must not leak between tests."""
+
+    return MongoDBManager(clock=lambda: _NOW)
+
+
+@pytest.fixture()
+def bootstrap_manager(manager: MongoDBManager) -> MongoDBManager:
+    """Provide a fresh manager whose ``_ensure_indexes`` is replaced by an ``AsyncMock``.
+
+    The instance is discarded after the test, so the override needs no undo step.
+    """
+
+    manager._ensure_indexes = AsyncMock()
+    return manager
 
-    await manager._ensure_indexes(collection)
 
-    assert collection.drop_index.await_args_list == [call("expires_at_ttl")]
-    assert collection.create_index.await_args_list == []
+@pytest.fixture(scope="module")
+def index_manager() -> MongoDBManager:
+    """Share one manager across ``_ensure_indexes`` tests, which never touch instance state."""
+
+    return MongoDBManager()
+
+
+_CREATE_TS_INDEX = call(_KEY_TS, name="timestamp_1")
 
 
 @pytest.mark.anyio
-async def test_ensure_indexes_drops_legacy_ttl_index_name(
-    monkeypatch: pytest.MonkeyPatch,
+@pytest.mark.parametrize(
+    ("existing_indexes", "expected_drops", "expected_creates"),
+    [
+        pytest.param(_IDX_TS_PLAIN, [], [], id="already-correct"),
+        pytest.param(_IDX_TS_MISSING, [], [_CREATE_TS_INDEX], id="missing-time-index"),
+        pytest.param(
+            _IDX_TS_TTL_LEGACY, ["timestamp_1"], [_CREATE_TS_INDEX], id="time-index-with-ttl"
+        ),
+        pytest.param(_IDX_EXPIRES_AT_TTL_600, ["expires_at_ttl"], [], id="wrong-expiry"),
+        pytest.param(_IDX_EXPIRES_AT_TTL, ["expires_at_ttl"], [], id="missing-partial-filter"),
+        pytest.param(_IDX_EXPIRES_AT_1, ["expires_at_1"], [], id="legacy-name"),
+        pytest.param(
+            _IDX_EXPIRES_AT_BOTH, ["expires_at_ttl", "expires_at_1"], [], id="both-legacy-names"
+        ),
+        pytest.param(
+            MappingProxyType({**_IDX_EXPIRES_AT_BOTH, **_IDX_TS_TTL_LEGACY}),
+            ["timestamp_1", "expires_at_ttl", "expires_at_1"],
+            [_CREATE_TS_INDEX],
+            id="every-index-outdated",
+        ),
+    ],
+)
+async def test_ensure_indexes_reconciles_existing_indexes(
+    index_manager: MongoDBManager,
+    existing_indexes: MappingProxyType,
+    expected_drops: list[str],
+    expected_creates: list[Any],
 ) -> None:
-    """Ensure legacy TTL index names are removed entirely."""
+    """Ensure the time index is (re)created as needed and legacy TTL indexes are removed."""
 
-    manager = MongoDBManager()
-    collection = AsyncMock()
-    collection.index_information = AsyncMock(
-        return_value={
-            "timestamp_1": {"key": [("timestamp", ASCENDING)]},
-            "expires_at_1": {
-                "key": [("expires_at", ASCENDING)],
-                "expireAfterSeconds": 0,
-            },
-        }
-    )
-    collection.drop_index = AsyncMock()
-    collection.create_index = AsyncMock()
+    collection = _index_collection(existing_indexes)
+
+    await index_manager._ensure_indexes(collection)
+
+    assert collection.drop_index.await_args_list == [call(name) for name in expected_drops]
+    assert collection.create_index.await_args_list == expected_creates
+
+
+@pytest.mark.anyio
+async def test_ensure_indexes_skips_listing_for_new_collections(index_manager: MongoDBManager) -> None:
+    """Freshly created collections should get their index without a ``listIndexes`` call."""
 
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: _FakeSettings())
+    collection = _index_collection()
 
-    await manager._ensure_indexes(collection)
+    await index_manager._ensure_indexes(collection, newly_created=True)
 
-    assert collection.drop_index.await_args_list == [call("expires_at_1")]
-    assert collection.create_index.await_args_list == []
+    collection.index_information.assert_not_awaited()
+    collection.create_index.assert_awaited_once_with(_KEY_TS, name="timestamp_1")
 
 
 @pytest.mark.anyio
 async def test_ensure_timeseries_collection_creates_collection_when_missing(
-    monkeypatch: pytest.MonkeyPatch,
+    bootstrap_manager: MongoDBManager,
+    fake_settings: _FakeSettings,
 ) -> None:
     """Verify a new time-series collection is created without collection-level TTL."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
-    database = MagicMock()
-    database.list_collection_names = AsyncMock(return_value=[])
-    database.create_collection = AsyncMock()
     collection = AsyncMock()
-    database.__getitem__.return_value = collection
-
-    ensure_indexes_mock = AsyncMock()
-    monkeypatch.setattr(manager, "_ensure_indexes", ensure_indexes_mock)
+    database = _Database(collection)
 
-    result = await manager._ensure_timeseries_collection(database, "analytics")
+    result = await bootstrap_manager._ensure_timeseries_collection(database, "analytics")
 
     database.create_collection.assert_awaited_once_with(
-        settings.mongodb_collection,
-        timeseries={"timeField": "timestamp", "metaField": "metadata"},
+        fake_settings.mongodb_collection,
+        timeseries=_TIMESERIES_OPTIONS,
     )
-    ensure_indexes_mock.assert_awaited_once_with(collection)
+    bootstrap_manager._ensure_indexes.assert_awaited_once_with(collection, newly_created=True)
     assert result is collection
 
 
 @pytest.mark.anyio
-async def test_get_timeseries_collection_triggers_cleanup(
-    monkeypatch: pytest.MonkeyPatch,
+async def test_ensure_timeseries_collection_initialises_once_under_concurrency(
+    bootstrap_manager: MongoDBManager,
 ) -> None:
-    """Ensure cached time-series collections purge expired documents."""
-
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    settings.expiration_cleanup_interval_seconds = 0
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
+    """Concurrent first requests for a database should create the collection once."""
 
     collection = AsyncMock()
-    collection.delete_many.return_value.deleted_count = 0
-    manager._collection_cache["analytics"] = collection
+    database = _Database(collection)
 
-    await manager.get_timeseries_collection_for_database("analytics")
+    results = await asyncio.gather(
+        bootstrap_manager._ensure_timeseries_collection(database, "analytics"),
+        bootstrap_manager._ensure_timeseries_collection(database, "analytics"),
+    )
 
-    assert collection.delete_many.await_args_list == [call({"expires_at": {"$lte": ANY}})]
+    assert results == [collection, collection]
+    assert database.create_collection.await_count == 1
+    bootstrap_manager._ensure_indexes.assert_awaited_once_with(collection, newly_created=True)
 
 
 @pytest.mark.anyio
-async def test_get_timeseries_collection_respects_cleanup_interval(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure cleanup does not run again before the configured interval."""
-
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    settings.expiration_cleanup_interval_seconds = 3600
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
+async def test_get_collections_do_not_run_cleanup(manager: MongoDBManager) -> None:
+    """Cached collections should be returned without touching expired documents."""
 
-    collection = AsyncMock()
-    collection.delete_many.return_value.deleted_count = 0
+    collection = _expiring_collection(deleted_count=0)
+    token_collection = _expiring_collection(deleted_count=0)
     manager._collection_cache["analytics"] = collection
+    manager._token_collection_cache["analytics"] = token_collection
 
-    await manager.get_timeseries_collection_for_database("analytics")
-    assert collection.delete_many.await_count == 1
+    assert await manager.get_timeseries_collection_for_database("analytics") is collection
+    assert await manager.get_token_collection_for_database("analytics") is token_collection
 
-    collection.delete_many.reset_mock()
-    await manager.get_timeseries_collection_for_database("analytics")
     collection.delete_many.assert_not_awaited()
+    token_collection.delete_many.assert_not_awaited()
 
 
 @pytest.mark.anyio
-async def test_get_token_collection_triggers_cleanup(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Ensure cached token collections drop expired documents and clear caches."""
-
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    settings.expiration_cleanup_interval_seconds = 0
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
+async def test_run_expiration_cleanup_purges_cached_collections(manager: MongoDBManager) -> None:
+    """A cleanup pass should purge expired documents and tokens and clear their caches."""
 
-    collection = AsyncMock()
-    cursor = AsyncMock()
-    cursor.to_list = AsyncMock(return_value=[{"_id": "abc", "token_hash": "hash"}])
-    collection.find = MagicMock(return_value=cursor)
-    collection.delete_many = AsyncMock()
-    collection.delete_many.return_value.deleted_count = 1
+    collection = _expiring_collection(deleted_count=0)
+    manager._collection_cache["analytics"] = collection
 
-    manager._token_collection_cache["analytics"] = collection
+    token_collection = _expiring_collection(deleted_count=1)
+    manager._token_collection_cache["analytics"] = token_collection
     manager._token_hash_cache["hash"] = "analytics"
 
-    await manager.get_token_collection_for_database("analytics")
+    await manager.run_expiration_cleanup()
 
-    collection.find.assert_called_once_with(
-        {"expires_at": {"$lte": ANY}},
-        projection={"_id": 1, "token_hash": 1},
-    )
-    cursor.to_list.assert_awaited_once_with(length=None)
-    collection.delete_many.assert_awaited_once_with({"_id": {"$in": ["abc"]}})
+    collection.delete_many.assert_awaited_once_with(_EXPIRED_FILTER)
+    token_collection.delete_many.assert_awaited_once_with(_EXPIRED_FILTER)
     assert "hash" not in manager._token_hash_cache
 
 
 @pytest.mark.anyio
-async def test_get_token_collection_respects_cleanup_interval(
-    monkeypatch: pytest.MonkeyPatch,
+async def test_token_cleanup_keeps_hash_cache_when_nothing_expired(manager: MongoDBManager) -> None:
+    """The steady state should cost one ``delete_many`` and leave cached lookups alone."""
+
+    token_collection = _expiring_collection(deleted_count=0)
+    manager._token_hash_cache["live"] = "analytics"
+
+    await manager._cleanup_token_collection(token_collection, "analytics", _NOW)
+
+    token_collection.delete_many.assert_awaited_once_with(_EXPIRED_FILTER)
+    assert manager._token_hash_cache == {"live": "analytics"}
+
+
+@pytest.mark.anyio
+async def test_token_cleanup_only_evicts_hashes_of_the_cleaned_database(manager: MongoDBManager) -> None:
+    """Deleting tokens should forget lookups for that database and keep every other one."""
+
+    token_collection = _expiring_collection(deleted_count=2)
+
+    other_databases = {f"hash-{index}": f"tenant-{index % 3}" for index in range(1000)}
+    manager._token_hash_cache.update(other_databases)
+    manager._token_hash_cache["expired"] = "analytics"
+    manager._token_hash_cache["live"] = "analytics"
+
+    await manager._cleanup_token_collection(token_collection, "analytics", _NOW)
+
+    assert manager._token_hash_cache == other_databases
+
+
+@pytest.mark.anyio
+async def test_token_cleanup_keeps_hash_cache_on_error(manager: MongoDBManager) -> None:
+    """A failed purge should be logged and leave the cached lookups untouched."""
+
+    token_collection = SimpleNamespace(delete_many=_raising(PyMongoError("boom")))
+    manager._token_hash_cache["live"] = "analytics"
+
+    await manager._cleanup_token_collection(token_collection, "analytics", _NOW)
+
+    assert manager._token_hash_cache == {"live": "analytics"}
+
+
+@pytest.mark.anyio
+@pytest.mark.settings(expiration_cleanup_interval_seconds=60)
+async def test_cleanup_loop_runs_once_per_interval(
+    manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    """Ensure token cleanup is throttled by the configured interval."""
+    """The background task should run one cleanup pass per interval until stopped."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    settings.expiration_cleanup_interval_seconds = 3600
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
+    sleeps: list[float] = []
+    real_sleep = asyncio.sleep
 
-    collection = AsyncMock()
-    cursor = AsyncMock()
-    cursor.to_list = AsyncMock(return_value=[])
-    collection.find = MagicMock(return_value=cursor)
-    collection.delete_many = AsyncMock()
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        if len(sleeps) > 2:
+            await real_sleep(3600)
 
-    manager._token_collection_cache["analytics"] = collection
+    monkeypatch.setattr(mongo_module.asyncio, "sleep", fake_sleep)
+    cleanup = AsyncMock()
+    monkeypatch.setattr(manager, "run_expiration_cleanup", cleanup)
 
-    await manager.get_token_collection_for_database("analytics")
-    collection.find.assert_called_once()
-    cursor.to_list.assert_awaited_once_with(length=None)
+    manager.start_cleanup()
+    await real_sleep(0)
+    await manager.stop_cleanup()
 
-    collection.find.reset_mock()
-    cursor.to_list.reset_mock()
-    collection.delete_many.reset_mock()
+    assert sleeps == [60, 60, 60]
+    assert cleanup.await_count == 2
+    assert manager._cleanup_task is None
 
-    await manager.get_token_collection_for_database("analytics")
-    collection.find.assert_not_called()
-    cursor.to_list.assert_not_called()
-    collection.delete_many.assert_not_awaited()
 
+@pytest.mark.anyio
+async def test_cleanup_loop_survives_failed_passes(
+    manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """An unexpected error in one pass is logged and the next pass still runs."""
+
+    sleeps: list[float] = []
+    real_sleep = asyncio.sleep
 
-def test_should_run_cleanup_obeys_interval() -> None:
-    """The cleanup helper should throttle executions based on the configured interval."""
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        if len(sleeps) > 2:
+            await real_sleep(3600)
 
-    manager = MongoDBManager()
-    tracker: dict[str, datetime] = {}
-    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    monkeypatch.setattr(mongo_module.asyncio, "sleep", fake_sleep)
+    cleanup = AsyncMock(side_effect=RuntimeError("boom"))
+    monkeypatch.setattr(manager, "run_expiration_cleanup", cleanup)
 
-    assert manager._should_run_cleanup(tracker, "db", now, 60) is True
-    assert manager._should_run_cleanup(tracker, "db", now, 60) is False
+    manager.start_cleanup()
+    await real_sleep(0)
+    await manager.stop_cleanup()
 
-    later = now + timedelta(seconds=61)
-    assert manager._should_run_cleanup(tracker, "db", later, 60) is True
+    assert cleanup.await_count == 2
+    assert manager._cleanup_task is None
 
 
 @pytest.mark.anyio
-async def test_get_database_caches_databases(monkeypatch: pytest.MonkeyPatch) -> None:
-    """The manager should cache database instances returned by the client."""
+async def test_stop_cleanup_swallows_crashed_task(
+    manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Shutdown should not re-raise an error that already ended the cleanup task."""
 
-    manager = MongoDBManager()
+    monkeypatch.setattr(manager, "_run_cleanup_loop", AsyncMock(side_effect=RuntimeError("boom")))
+
+    manager.start_cleanup()
+    await asyncio.sleep(0)
+    await manager.stop_cleanup()
+
+    assert manager._cleanup_task is None
+
+
+@pytest.mark.anyio
+@pytest.mark.settings(expiration_cleanup_interval_seconds=0)
+async def test_start_cleanup_floors_non_positive_interval(
+    manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A zero interval should sweep as often as the minimum interval allows."""
+
+    loop = AsyncMock()
+    monkeypatch.setattr(manager, "_run_cleanup_loop", loop)
+
+    manager.start_cleanup()
+    await manager.stop_cleanup()
+
+    loop.assert_called_once_with(MIN_CLEANUP_INTERVAL_SECONDS)
+
+
+@pytest.mark.anyio
+async def test_get_database_caches_databases(manager: MongoDBManager) -> None:
+    """The manager should cache database instances returned by the client."""
 
     class _Client:
         def __init__(self) -> None:
@@ -355,104 +437,55 @@ async def test_get_database_caches_databases(monkeypatch: pytest.MonkeyPatch) ->
 
         def __getitem__(self, name: str) -> SimpleNamespace:
             self.calls.append(name)
-            database = SimpleNamespace(name=name, list_collection_names=AsyncMock())
+            database = SimpleNamespace(name=name, list_collection_names=_returning([]))
             return database
 
         async def list_database_names(self) -> list[str]:
             return ["existing"]
 
-    manager._client = _Client()
+    client = _Client()
+    manager._client = client
 
     database = await manager._get_database("analytics")
     assert database.name == "analytics"
-    assert manager._database_cache["analytics"] is database
 
     cached = await manager._get_database("analytics")
     assert cached is database
+    assert client.calls == ["analytics"]
 
 
 @pytest.mark.anyio
 async def test_ensure_token_collection_creates_indexes(
-    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+    manager: MongoDBManager,
+    fake_pymongo: FakePyMongo,
+    fake_settings: _FakeSettings,
 ) -> None:
     """Token collections should be created and indexed when missing."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
-    database = MagicMock()
-    database.name = "analytics"
-    database.list_collection_names = AsyncMock(return_value=[])
-    database.create_collection = AsyncMock()
     collection = AsyncMock()
-    database.__getitem__.return_value = collection
+    database = _Database(collection)
 
     result = await manager._ensure_token_collection(database)
 
-    database.create_collection.assert_awaited_once_with(settings.api_tokens_collection)
+    database.create_collection.assert_awaited_once_with(fake_settings.api_tokens_collection)
     assert collection.create_index.await_args_list[0].args == ("token_hash",)
     assert manager._token_collection_cache["analytics"] is result
 
 
-@pytest.mark.anyio
-async def test_get_token_collection_triggers_cleanup(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
-    """Retrieving token collections should run cleanup logic when cached."""
-
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    settings.expiration_cleanup_interval_seconds = 0
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
-    collection = AsyncMock()
-    cursor = AsyncMock()
-    cursor.to_list = AsyncMock(return_value=[])
-    collection.find = MagicMock(return_value=cursor)
-    manager._token_collection_cache["analytics"] = collection
-
-    await manager.get_token_collection_for_database("analytics")
-
-    collection.find.assert_called_once()
-
-
 @pytest.mark.anyio
 async def test_iter_token_collections_discovers_databases(
-    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+    manager: MongoDBManager,
+    fake_pymongo: FakePyMongo,
+    monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     """The iterator should include cached and newly discovered collections."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
     cached_collection = AsyncMock()
     manager._token_collection_cache["cached"] = cached_collection
 
-    class _Client:
-        def __init__(self) -> None:
-            self._databases = {
-                "cached": SimpleNamespace(
-                    list_collection_names=AsyncMock(return_value=[settings.api_tokens_collection])
-                ),
-                "remote": SimpleNamespace(
-                    list_collection_names=AsyncMock(return_value=[settings.api_tokens_collection])
-                ),
-            }
-
-        async def list_database_names(self) -> list[str]:
-            return ["admin", "cached", "remote"]
-
-        def __getitem__(self, name: str) -> SimpleNamespace:
-            return self._databases[name]
-
-    manager._client = _Client()
-
-    async def ensure(database):
-        return AsyncMock()
-
-    manager._database_cache["cached"] = manager._client._databases["cached"]
-    monkeypatch.setattr(manager, "_ensure_token_collection", AsyncMock(return_value=AsyncMock()))
-    monkeypatch.setattr(manager, "_cleanup_token_collection", AsyncMock())
+    manager._client = _TokenClient("admin", "cached", "remote")
+    manager._database_cache["cached"] = _TOKEN_DATABASE
+    monkeypatch.setattr(manager, "_ensure_token_collection", _returning(object()))
 
     collections = await manager.iter_token_collections()
 
@@ -461,21 +494,18 @@ async def test_iter_token_collections_discovers_databases(
 
 @pytest.mark.anyio
 async def test_iter_token_collections_raises_on_error(
-    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+    manager: MongoDBManager,
+    fake_pymongo: FakePyMongo,
 ) -> None:
     """Errors when listing collections should raise ``MongoConnectionError``."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
     class _Client:
         async def list_database_names(self) -> list[str]:
             return ["analytics"]
 
         def __getitem__(self, name: str) -> SimpleNamespace:
             database = SimpleNamespace()
-            database.list_collection_names = AsyncMock(side_effect=PyMongoError("boom"))
+            database.list_collection_names = _raising(PyMongoError("boom"))
             return database
 
     manager._client = _Client()
@@ -485,52 +515,43 @@ async def test_iter_token_collections_raises_on_error(
 
 
 @pytest.mark.anyio
-async def test_find_token_document_prefers_cache(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_find_token_document_prefers_cache(
+    manager: MongoDBManager,
+    fake_pymongo: FakePyMongo,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
     """Token lookups should first consult the hash cache."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
     collection = AsyncMock()
     collection.find_one = AsyncMock(return_value={"_id": "id", "token_hash": "hash"})
     manager._token_collection_cache["analytics"] = collection
     manager._token_hash_cache["hash"] = "analytics"
-    manager._client = SimpleNamespace(list_database_names=AsyncMock(return_value=[]))
-    monkeypatch.setattr(manager, "get_token_collection_for_database", AsyncMock(return_value=collection))
+    manager._client = SimpleNamespace(list_database_names=_returning([]))
+    monkeypatch.setattr(manager, "get_token_collection_for_database", _returning(collection))
 
     document, found_collection = await manager.find_token_document("hash")
 
     assert document["_id"] == "id"
     assert found_collection is collection
+    collection.find_one.assert_awaited_once_with(
+        {"token_hash": "hash"}, projection=None, hint=TOKEN_HASH_INDEX_HINT
+    )
 
 
 @pytest.mark.anyio
-async def test_find_token_document_searches_all_databases(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_find_token_document_searches_all_databases(
+    manager: MongoDBManager,
+    fake_pymongo: FakePyMongo,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
     """The lookup should iterate uncached databases when necessary."""
 
-    manager = MongoDBManager()
-    settings = _FakeSettings()
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-
-    remote_collection = AsyncMock()
-    remote_collection.find_one = AsyncMock(return_value={"_id": "id", "token_hash": "hash"})
-
-    class _Client:
-        def __init__(self) -> None:
-            self.database = SimpleNamespace(
-                list_collection_names=AsyncMock(return_value=[settings.api_tokens_collection])
-            )
-
-        async def list_database_names(self) -> list[str]:
-            return ["remote"]
+    remote_collection = SimpleNamespace()
+    remote_collection.find_one = _returning({"_id": "id", "token_hash": "hash"})
 
-        def __getitem__(self, name: str) -> SimpleNamespace:
-            return self.database
-
-    manager._client = _Client()
+    manager._client = _TokenClient("remote")
     manager._database_cache = {}
-    monkeypatch.setattr(manager, "_ensure_token_collection", AsyncMock(return_value=remote_collection))
+    monkeypatch.setattr(manager, "_ensure_token_collection", _returning(remote_collection))
 
     document, collection = await manager.find_token_document("hash")
 
@@ -539,10 +560,9 @@ async def test_find_token_document_searches_all_databases(fake_pymongo: FakePyMo
 
 
 @pytest.mark.anyio
-async def test_close_resets_internal_state() -> None:
+async def test_close_resets_internal_state(manager: MongoDBManager) -> None:
     """Closing the manager should drop cached references."""
 
-    manager = MongoDBManager()
     manager._client = SimpleNamespace(close=lambda: None)
     manager._database_cache = {"db": object()}
     manager._collection_cache = {"db": object()}
@@ -558,7 +578,11 @@ async def test_close_resets_internal_state() -> None:
 
 
 @pytest.mark.anyio
-async def test_connect_initialises_client(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_connect_initialises_client(
+    fake_pymongo: FakePyMongo,
+    fake_motor: type[FakeMotorClient],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
     """Connect should instantiate the Motor client and clear caches."""
 
     manager = MongoDBManager()
@@ -573,26 +597,14 @@ async def test_connect_initialises_client(fake_pymongo: FakePyMongo, monkeypatch
         api_tokens_collection="api_tokens",
         expiration_cleanup_interval_seconds=60,
     )
-    monkeypatch.setattr("app.db.mongo.get_settings", lambda: settings)
-    monkeypatch.setattr("app.db.mongo._PYMONGO_AVAILABLE", True)
-
-    class _MotorClient:
-        def __init__(self, uri: str, **kwargs: Any) -> None:
-            self.uri = uri
-            self.kwargs = kwargs
-            self.closed = False
-
-        async def server_info(self) -> dict[str, str]:
-            return {"version": "mock"}
-
-        def close(self) -> None:
-            self.closed = True
-
-    motor_module = SimpleNamespace(AsyncIOMotorClient=_MotorClient)
-    monkeypatch.setitem(sys.modules, "motor", SimpleNamespace(motor_asyncio=motor_module))
-    monkeypatch.setitem(sys.modules, "motor.motor_asyncio", motor_module)
+    monkeypatch.setattr(mongo_module, "get_settings", lambda: settings)
+    monkeypatch.setattr(mongo_module, "_PYMONGO_AVAILABLE", True)
 
     await manager.connect()
 
-    assert isinstance(manager._client, _MotorClient)
+    client = manager._client
+    assert isinstance(client, fake_motor)
+    assert client.uri == settings.mongodb_uri
+
     await manager.close()
+    assert client.closed
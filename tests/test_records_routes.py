@@ -2,73 +2,77 @@
 
 from __future__ import annotations
 
+from datetime import datetime, timezone
+from unittest.mock import ANY
+from urllib.parse import urlencode
+
 import pytest
-from fastapi.testclient import TestClient
+from httpx import AsyncClient
 
-from app.main import app
-from app.db.mongo import mongo_manager
+from app.routes.records import BULK_MAX_RECORDS
 from app.services import records as service
 from app.services.tokens import TokenNotFoundError
+from tests.conftest import AsyncRecorder
 
 
-@pytest.fixture()
-def client_without_token(monkeypatch: pytest.MonkeyPatch) -> TestClient:
-    """Create a FastAPI test client with MongoDB interactions disabled."""
-
-    async def fake_connect() -> None:  # pragma: no cover - trivial coroutine
-        return None
+def _search_url(**params: object) -> str:
+    """Return the search route URL with ``params`` encoded once at import time."""
 
-    async def fake_close() -> None:  # pragma: no cover - trivial coroutine
-        return None
+    return "/api/records/search?" + urlencode(params)
 
-    async def fake_get_collection(database_name: str):  # pragma: no cover - trivial coroutine
-        return object()
 
-    monkeypatch.setattr(mongo_manager, "connect", fake_connect)
-    monkeypatch.setattr(mongo_manager, "close", fake_close)
-    monkeypatch.setattr(
-        mongo_manager,
-        "get_timeseries_collection_for_database",
-        fake_get_collection,
-    )
-
-    with TestClient(app) as test_client:
-        yield test_client
+_INVERTED_SEARCH_URL = _search_url(
+    field="acronym",
+    value="swe",
+    latest="true",
+    limit=25,
+    start_time="2026-01-01T00:00:00Z",
+    end_time="2024-12-31T23:59:59Z",
+)
+_ORDERED_SEARCH_URL = _search_url(
+    field="acronym",
+    value="swe",
+    latest="true",
+    limit=25,
+    start_time="2024-01-01T00:00:00Z",
+    end_time="2024-02-01T00:00:00Z",
+)
+_LATEST_SEARCH_URL = _search_url(field="acronym", value="swe", latest="true")
+_COUNTED_SEARCH_URL = _search_url(field="acronym", value="swe", limit=10, include_count="true")
 
 
 @pytest.fixture()
-def client(client_without_token: TestClient) -> TestClient:
-    """Provide a test client with the administrator token pre-configured."""
+def auth_headers() -> dict[str, str]:
+    """Headers authenticating a request with the administrator token."""
 
-    client_without_token.headers.update(
-        {
-            "Authorization": "Bearer test-admin-token",
-            "X-Database-Name": "test-measurements",
-        }
-    )
-    return client_without_token
+    return {
+        "Authorization": "Bearer test-admin-token",
+        "X-Database-Name": "test-measurements",
+    }
 
 
-def test_records_require_token(client_without_token: TestClient) -> None:
+@pytest.mark.anyio
+async def test_records_require_token(asgi_client: AsyncClient) -> None:
     """Ensure requests without a token are rejected."""
 
-    response = client_without_token.get("/api/records/search")
+    response = await asgi_client.get("/api/records/search")
 
     assert response.status_code == 401
     assert response.json()["detail"] == "API token required."
 
 
-def test_records_reject_invalid_token(
-    monkeypatch: pytest.MonkeyPatch, client_without_token: TestClient
+@pytest.mark.anyio
+async def test_records_reject_invalid_token(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient
 ) -> None:
     """Ensure invalid tokens trigger a 401 response."""
 
-    async def fake_fetch_token_metadata(token: str):  # pragma: no cover - trivial coroutine
+    async def fake_fetch_token_database(token: str, digest: bytes | None = None):  # pragma: no cover - trivial coroutine
         raise TokenNotFoundError("Invalid API token.")
 
-    monkeypatch.setattr("app.dependencies.fetch_token_metadata", fake_fetch_token_metadata)
+    monkeypatch.setattr("app.dependencies.fetch_token_database", fake_fetch_token_database)
 
-    response = client_without_token.get(
+    response = await asgi_client.get(
         "/api/records/search", headers={"Authorization": "Bearer invalid-token"}
     )
 
@@ -76,56 +80,202 @@ def test_records_reject_invalid_token(
     assert response.json()["detail"] == "Invalid API token."
 
 
-def test_search_rejects_inverted_time_range(monkeypatch: pytest.MonkeyPatch, client: TestClient) -> None:
-    """Ensure the API rejects searches where start_time is after end_time."""
+@pytest.mark.parametrize(
+    ("url", "status_code", "detail", "searched"),
+    [
+        pytest.param(
+            _INVERTED_SEARCH_URL,
+            400,
+            "The start_time must be before the end_time.",
+            False,
+            id="inverted",
+        ),
+        pytest.param(
+            _ORDERED_SEARCH_URL,
+            404,
+            "No records found for the given filters.",
+            True,
+            id="ordered",
+        ),
+    ],
+)
+@pytest.mark.anyio
+async def test_search_validates_time_range(
+    monkeypatch: pytest.MonkeyPatch,
+    asgi_client: AsyncClient,
+    auth_headers: dict[str, str],
+    url: str,
+    status_code: int,
+    detail: str,
+    searched: bool,
+) -> None:
+    """Ensure inverted time ranges are rejected before the search service runs."""
+
+    stub_search_records = AsyncRecorder(([], False))
+    monkeypatch.setattr(service, "search_records", stub_search_records)
+
+    response = await asgi_client.get(url, headers=auth_headers)
 
-    called = {"value": False}
+    assert response.status_code == status_code
+    assert response.json()["detail"] == detail
+    assert stub_search_records.await_count == int(searched)
 
-    async def stub_search_records(**kwargs):  # pragma: no cover - branch guard
-        called["value"] = True
-        return ([], False)
 
+@pytest.mark.anyio
+async def test_search_route_is_not_shadowed_by_record_id(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """Verify ``/search`` hits the search handler rather than the ``/{record_id}`` routes."""
+
+    stub_search_records = AsyncRecorder(([], True))
     monkeypatch.setattr(service, "search_records", stub_search_records)
 
-    response = client.get(
-        "/api/records/search",
-        params={
-            "field": "acronym",
-            "value": "swe",
-            "latest": "true",
-            "limit": 25,
-            "start_time": "2026-01-01T00:00:00Z",
-            "end_time": "2024-12-31T23:59:59Z",
-        },
+    response = await asgi_client.get(_LATEST_SEARCH_URL, headers=auth_headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "No records found for the given filters."
+
+    stub_search_records.assert_awaited_once_with(
+        collection=ANY,
+        field="acronym",
+        value="swe",
+        start_time=None,
+        end_time=None,
+        latest=True,
+        limit=1,
     )
 
-    assert response.status_code == 400
-    assert response.json()["detail"] == "The start_time must be before the end_time."
-    assert called["value"] is False
 
+@pytest.mark.anyio
+async def test_search_includes_total_only_when_requested(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """``include_count`` adds the matching total; plain searches skip the count query."""
 
-def test_search_route_is_not_shadowed_by_record_id(monkeypatch: pytest.MonkeyPatch, client: TestClient) -> None:
-    """Verify ``/search`` hits the search handler rather than the ``/{record_id}`` routes."""
+    stub_count_records = AsyncRecorder(42)
+    monkeypatch.setattr(service, "search_records", AsyncRecorder(([], False)))
+    monkeypatch.setattr(service, "count_records", stub_count_records)
 
-    captured: dict[str, object] = {}
+    response = await asgi_client.get(_COUNTED_SEARCH_URL, headers=auth_headers)
 
-    async def stub_search_records(**kwargs):
-        captured.update(kwargs)
-        return ([], True)
+    assert response.status_code == 200
+    assert response.json() == {"latest": False, "count": 0, "total": 42, "items": []}
+    stub_count_records.assert_awaited_once_with(
+        collection=ANY, field="acronym", value="swe", start_time=None, end_time=None
+    )
 
-    monkeypatch.setattr(service, "search_records", stub_search_records)
+    response = await asgi_client.get(_search_url(field="acronym", value="swe"), headers=auth_headers)
+
+    assert response.json()["total"] is None
+    assert stub_count_records.await_count == 1
 
-    response = client.get(
-        "/api/records/search",
-        params={"field": "acronym", "value": "swe", "latest": "true"},
+
+@pytest.mark.anyio
+async def test_search_skips_count_when_latest_misses(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """A ``latest`` search without results should 404 before running the count."""
+
+    stub_count_records = AsyncRecorder(42)
+    monkeypatch.setattr(service, "search_records", AsyncRecorder(([], True)))
+    monkeypatch.setattr(service, "count_records", stub_count_records)
+
+    response = await asgi_client.get(
+        _search_url(field="acronym", value="swe", latest="true", include_count="true"),
+        headers=auth_headers,
     )
 
     assert response.status_code == 404
-    assert response.json()["detail"] == "No records found for the given filters."
+    stub_count_records.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_bulk_create_returns_created_records(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """Ensure the bulk route forwards every payload and returns the stored records."""
+
+    captured: dict[str, object] = {}
+
+    async def stub_create_records_bulk(collection, payloads):
+        captured["count"] = len(payloads)
+        return [
+            {
+                "id": str(index),
+                "acronym": payload.source,
+                "payload": payload.payload,
+                "metadata": {},
+                "timestamp": payload.timestamp,
+            }
+            for index, payload in enumerate(payloads)
+        ]
+
+    monkeypatch.setattr(service, "create_records_bulk", stub_create_records_bulk)
+
+    response = await asgi_client.post(
+        "/api/records/bulk",
+        headers=auth_headers,
+        json=[
+            {"acronym": "swe", "payload": {"n": 1}},
+            {"acronym": "swe", "payload": {"n": 2}},
+        ],
+    )
 
-    assert captured["field"] == "acronym"
-    assert captured["value"] == "swe"
-    assert captured["latest"] is True
-    assert captured["limit"] == 1
-    assert captured["start_time"] is None
-    assert captured["end_time"] is None
+    assert response.status_code == 201
+    assert [item["id"] for item in response.json()] == ["0", "1"]
+    assert captured["count"] == 2
+
+
+@pytest.mark.anyio
+async def test_bulk_create_rejects_oversized_batches(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """Batches above ``BULK_MAX_RECORDS`` should fail validation before reaching MongoDB."""
+
+    stub_create_records_bulk = AsyncRecorder([])
+    monkeypatch.setattr(service, "create_records_bulk", stub_create_records_bulk)
+
+    response = await asgi_client.post(
+        "/api/records/bulk",
+        headers=auth_headers,
+        json=[{"acronym": "swe", "payload": {}}] * (BULK_MAX_RECORDS + 1),
+    )
+
+    assert response.status_code == 422
+    stub_create_records_bulk.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_list_records_serializes_aliases_and_iso_timestamps(
+    monkeypatch: pytest.MonkeyPatch, asgi_client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    """The pre-serialised list response should match the declared response model."""
+
+    async def stub_list_records(collection, limit, skip):
+        return [
+            {
+                "id": "abc123",
+                "acronym": "swe",
+                "payload": {"n": 1},
+                "metadata": {},
+                "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            }
+        ]
+
+    monkeypatch.setattr(service, "list_records", stub_list_records)
+
+    response = await asgi_client.get("/api/records", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [
+        {
+            "acronym": "swe",
+            "component": None,
+            "payload": {"n": 1},
+            "metadata": {},
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "id": "abc123",
+            "expires_at": None,
+        }
+    ]
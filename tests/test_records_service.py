@@ -4,31 +4,28 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
+from typing import Callable
 from unittest.mock import AsyncMock
 
 import pytest
 
 from app.models.time_series import TimeSeriesRecordCreate
 from app.services import records
+from tests.conftest import FakeCollection
 
 
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Force the anyio plugin to run tests using the asyncio backend."""
+pytestmark = pytest.mark.anyio
 
-    return "asyncio"
 
-
-@pytest.mark.anyio
-async def test_create_record_applies_expiration() -> None:
+async def test_create_record_applies_expiration(
+    make_collection: Callable[..., FakeCollection],
+) -> None:
     """Ensure records store an expires_at value when requested."""
 
     now = datetime(2024, 1, 1, tzinfo=timezone.utc)
-    collection = AsyncMock()
-    collection.insert_one = AsyncMock(return_value=SimpleNamespace(inserted_id="abc123"))
     expected_expires_at = now + timedelta(seconds=600)
-    collection.find_one = AsyncMock(
-        return_value={
+    collection = make_collection(
+        find_one={
             "_id": "abc123",
             "source": "sensor",
             "component": None,
@@ -49,20 +46,19 @@ async def test_create_record_applies_expiration() -> None:
 
     document = await records.create_record(collection, payload)
 
-    inserted_document = collection.insert_one.await_args.args[0]
+    inserted_document, = collection.insert_one_calls[0].args
     assert inserted_document["expires_at"] == expected_expires_at
     assert document["expires_at"] == expected_expires_at
 
 
-@pytest.mark.anyio
-async def test_create_record_without_expiration() -> None:
+async def test_create_record_without_expiration(
+    make_collection: Callable[..., FakeCollection],
+) -> None:
     """Ensure records omit expires_at when no TTL is provided."""
 
     now = datetime(2024, 1, 1, tzinfo=timezone.utc)
-    collection = AsyncMock()
-    collection.insert_one = AsyncMock(return_value=SimpleNamespace(inserted_id="abc123"))
-    collection.find_one = AsyncMock(
-        return_value={
+    collection = make_collection(
+        find_one={
             "_id": "abc123",
             "source": "sensor",
             "component": None,
@@ -81,6 +77,63 @@ async def test_create_record_without_expiration() -> None:
 
     document = await records.create_record(collection, payload)
 
-    inserted_document = collection.insert_one.await_args.args[0]
+    inserted_document, = collection.insert_one_calls[0].args
     assert "expires_at" not in inserted_document
     assert "expires_at" not in document
+
+
+async def test_create_records_bulk_uses_unordered_insert_many() -> None:
+    """Bulk creation should issue one unordered ``insert_many`` and serialise the results."""
+
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    collection = AsyncMock()
+    collection.insert_many = AsyncMock(return_value=SimpleNamespace(inserted_ids=["a", "b"]))
+
+    payloads = [
+        TimeSeriesRecordCreate(source="sensor", payload={"n": 1}, timestamp=now),
+        TimeSeriesRecordCreate(source="sensor", payload={"n": 2}, timestamp=now, ttl=60),
+    ]
+
+    documents = await records.create_records_bulk(collection, payloads)
+
+    inserted, = collection.insert_many.await_args.args
+    assert collection.insert_many.await_args.kwargs == {"ordered": False}
+    assert "expires_at" not in inserted[0]
+    assert inserted[1]["expires_at"] == now + timedelta(seconds=60)
+    assert [document["id"] for document in documents] == ["a", "b"]
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_records_bulk_reports_partial_failures() -> None:
+    """A partially applied unordered insert should report stored and rejected records."""
+
+    from pymongo.errors import BulkWriteError
+
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def insert_many(documents, ordered):
+        for index, document in enumerate(documents):
+            document["_id"] = f"id{index}"
+        raise BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "rejected"}]})
+
+    collection = AsyncMock()
+    collection.insert_many = insert_many
+    payloads = [
+        TimeSeriesRecordCreate(source="sensor", payload={"n": n}, timestamp=now) for n in range(3)
+    ]
+
+    with pytest.raises(records.RecordBulkInsertError) as excinfo:
+        await records.create_records_bulk(collection, payloads)
+
+    assert str(excinfo.value) == "Stored 2 of 3 records in MongoDB."
+    assert excinfo.value.inserted_ids == ["id0", "id2"]
+    assert excinfo.value.failed == [{"index": 1, "error": "rejected"}]
+
+
+async def test_create_records_bulk_skips_empty_batches() -> None:
+    """An empty batch should not reach MongoDB."""
+
+    collection = AsyncMock()
+
+    assert await records.create_records_bulk(collection, []) == []
+    collection.insert_many.assert_not_awaited()
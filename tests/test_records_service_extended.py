@@ -6,7 +6,7 @@ import sys
 from datetime import datetime, timezone
 from types import SimpleNamespace
 from typing import Any, Dict, List
-from unittest.mock import AsyncMock, MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock, call
 
 import pytest
 
@@ -19,14 +19,19 @@ from app.services.records import (
     RecordPersistenceError,
     RecordQueryError,
 )
-from tests.conftest import FakePyMongo
+from tests.conftest import FakeCollection, FakePyMongo
 
 
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Execute async tests using asyncio."""
+pytestmark = pytest.mark.anyio
 
-    return "asyncio"
+_real_object_id = records._object_id
+
+
+@pytest.fixture(autouse=True)
+def _identity_object_id(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Let tests use plain string identifiers in place of ``ObjectId`` values."""
+
+    monkeypatch.setattr(records, "_object_id", lambda value: value)
 
 
 def test_normalize_field_path_supports_aliases() -> None:
@@ -43,7 +48,7 @@ def test_object_id_import_guard(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setitem(sys.modules, "bson", None)
 
     with pytest.raises(InvalidRecordIdError):
-        records._object_id("abc123")
+        _real_object_id("abc123")
 
 
 def test_normalize_timestamp_converts_naive_datetimes() -> None:
@@ -55,6 +60,18 @@ def test_normalize_timestamp_converts_naive_datetimes() -> None:
     assert normalized.hour == 12
 
 
+def test_build_time_range_covers_open_and_closed_windows() -> None:
+    """Range filters should only include the provided bounds."""
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    assert records._build_time_range(start, end) == {"$gte": start, "$lte": end}
+    assert records._build_time_range(start, None) == {"$gte": start}
+    assert records._build_time_range(None, end) == {"$lte": end}
+    assert records._build_time_range(None, None) is None
+
+
 def test_is_mock_collection_detects_mocks() -> None:
     """Helper should correctly flag unittest mocks and ignore normal objects."""
 
@@ -62,62 +79,57 @@ def test_is_mock_collection_detects_mocks() -> None:
     assert records._is_mock_collection(object()) is False
 
 
-@pytest.mark.anyio
-async def test_fetch_record_serializes_document(monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_fetch_record_serializes_document() -> None:
     """Fetching a document should normalise the MongoDB identifier."""
 
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value={"_id": "abc", "source": "sensor"})
-
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(find_one_result={"_id": "abc", "source": "sensor"})
 
     document = await records.fetch_record(collection, "abc")
 
     assert document["id"] == "abc"
-    collection.find_one.assert_awaited_once_with({"_id": "abc"})
+    assert collection.find_one_calls == [call({"_id": "abc"})]
 
 
-@pytest.mark.anyio
-async def test_fetch_record_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_fetch_record_missing() -> None:
     """Missing documents should raise a ``RecordNotFoundError``."""
 
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value=None)
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(find_one_result=None)
 
     with pytest.raises(RecordNotFoundError):
         await records.fetch_record(collection, "missing")
 
 
 class _FakeCursor:
-    """Minimal async cursor mimicking Motor behaviour."""
+    """Minimal async cursor mimicking Motor behaviour.
+
+    Only the arguments of the last ``sort``/``skip``/``limit`` call are kept.
+    """
 
     def __init__(self, documents: List[Dict[str, Any]], error: Exception | None = None) -> None:
         self.documents = documents
         self.error = error
-        self.operations: list[tuple[str, Any]] = []
+        self.sort_args: tuple[str, int] | None = None
+        self.skip_amount: int | None = None
+        self.limit_amount: int | None = None
 
     def sort(self, field: str, order: int) -> "_FakeCursor":
-        self.operations.append(("sort", (field, order)))
+        self.sort_args = (field, order)
         return self
 
     def skip(self, amount: int) -> "_FakeCursor":
-        self.operations.append(("skip", amount))
+        self.skip_amount = amount
         return self
 
     def limit(self, amount: int) -> "_FakeCursor":
-        self.operations.append(("limit", amount))
         self.limit_amount = amount
         return self
 
     async def to_list(self, length: int) -> List[Dict[str, Any]]:
         if self.error:
             raise self.error
-        self.operations.append(("to_list", length))
         return self.documents
 
 
-@pytest.mark.anyio
 async def test_list_records_returns_serialized_documents(fake_pymongo: FakePyMongo) -> None:
     """Records should be sorted and serialised when listing."""
 
@@ -129,11 +141,12 @@ async def test_list_records_returns_serialized_documents(fake_pymongo: FakePyMon
     results = await records.list_records(collection, limit=5, skip=2)
 
     assert results == [{"id": "1", "source": "sensor"}]
-    assert ("sort", ("timestamp", fake_pymongo.module.DESCENDING)) in cursor.operations
-    assert ("limit", 5) in cursor.operations
+    collection.find.assert_called_once_with({}, hint=records.TIME_INDEX_HINT)
+    assert cursor.sort_args == ("timestamp", fake_pymongo.module.DESCENDING)
+    assert cursor.skip_amount == 2
+    assert cursor.limit_amount == 5
 
 
-@pytest.mark.anyio
 async def test_list_records_wraps_errors(fake_pymongo: FakePyMongo) -> None:
     """PyMongo errors should surface as ``RecordQueryError``."""
 
@@ -146,15 +159,11 @@ async def test_list_records_wraps_errors(fake_pymongo: FakePyMongo) -> None:
         await records.list_records(collection)
 
 
-@pytest.mark.anyio
-async def test_update_record_with_metadata_only(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_update_record_with_metadata_only(fake_pymongo: FakePyMongo) -> None:
     """Metadata-only updates should use ``find_one_and_update``."""
 
-    collection = AsyncMock()
     updated_doc = {"_id": "abc", "metadata": {"k": "v"}}
-    collection.find_one_and_update = AsyncMock(return_value=updated_doc)
-
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(find_one_and_update_result=updated_doc)
 
     document = await records.update_record(
         collection,
@@ -163,33 +172,26 @@ async def test_update_record_with_metadata_only(fake_pymongo: FakePyMongo, monke
     )
 
     assert document["metadata"] == {"k": "v"}
-    collection.find_one_and_update.assert_awaited_once()
+    assert len(collection.find_one_and_update_calls) == 1
 
 
-@pytest.mark.anyio
-async def test_update_record_requires_fields(monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_update_record_requires_fields() -> None:
     """An empty update should raise a clear validation error."""
 
-    collection = AsyncMock()
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection()
 
     with pytest.raises(EmptyUpdateError):
         await records.update_record(collection, "abc", records.TimeSeriesRecordUpdate())
 
 
-@pytest.mark.anyio
 async def test_update_record_falls_back_to_replace(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
     """Timeseries restrictions should delegate to the replacement helper."""
 
-    collection = AsyncMock()
-
-    async def failing_find_one_and_update(*args, **kwargs):
-        raise fake_pymongo.OperationFailure("time-series restriction")
-
-    collection.find_one_and_update = AsyncMock(side_effect=failing_find_one_and_update)
+    collection = FakeCollection(
+        find_one_and_update_result=fake_pymongo.OperationFailure("time-series restriction")
+    )
     replacement = AsyncMock(return_value={"_id": "abc", "source": "sensor"})
     monkeypatch.setattr(records, "_replace_document", replacement)
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
 
     document = await records.update_record(
         collection,
@@ -201,12 +203,10 @@ async def test_update_record_falls_back_to_replace(fake_pymongo: FakePyMongo, mo
     replacement.assert_awaited()
 
 
-@pytest.mark.anyio
 async def test_replace_document_handles_missing_document(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
     """Replacing a non-existent document should raise ``RecordNotFoundError``."""
 
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value=None)
+    collection = FakeCollection(find_one_result=None)
 
     monkeypatch.setattr(records, "_reload_document", AsyncMock())
 
@@ -214,67 +214,56 @@ async def test_replace_document_handles_missing_document(fake_pymongo: FakePyMon
         await records._replace_document(collection, "abc", {"metadata": {}})
 
 
-@pytest.mark.anyio
 async def test_replace_document_reinserts_on_timeseries_error(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
     """Timeseries restrictions should trigger delete-and-reinsert fallback."""
 
     existing = {"_id": "abc", "source": "sensor"}
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value=existing)
-
-    async def replace_one(*args, **kwargs):
-        raise fake_pymongo.OperationFailure("time-series restriction")
-
-    collection.replace_one = AsyncMock(side_effect=replace_one)
+    collection = FakeCollection(
+        find_one_result=existing,
+        replace_one_result=fake_pymongo.OperationFailure("time-series restriction"),
+        delete_one_result=SimpleNamespace(deleted_count=1),
+    )
     reloaded = {"_id": "abc", "source": "sensor", "metadata": {"k": "v"}}
     monkeypatch.setattr(records, "_reload_document", AsyncMock(return_value=reloaded))
 
-    delete_result = SimpleNamespace(deleted_count=1)
-    collection.delete_one = AsyncMock(return_value=delete_result)
-    collection.insert_one = AsyncMock()
-
     document = await records._replace_document(collection, "abc", {"metadata": {"k": "v"}})
 
     assert document == reloaded
-    collection.delete_one.assert_awaited_once_with({"_id": "abc"})
-    collection.insert_one.assert_awaited_with({"_id": "abc", "metadata": {"k": "v"}, "source": "sensor"})
+    assert collection.delete_one_calls == [call({"_id": "abc"})]
+    assert collection.insert_one_calls == [call({"_id": "abc", "metadata": {"k": "v"}, "source": "sensor"})]
 
 
-@pytest.mark.anyio
 async def test_replace_document_raises_when_not_matched(fake_pymongo: FakePyMongo) -> None:
     """No documents updated should raise a not-found error."""
 
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value={"_id": "abc"})
-    collection.replace_one = AsyncMock(return_value=SimpleNamespace(matched_count=0))
+    collection = FakeCollection(
+        find_one_result={"_id": "abc"},
+        replace_one_result=SimpleNamespace(matched_count=0),
+    )
 
     with pytest.raises(RecordNotFoundError):
         await records._replace_document(collection, "abc", {"metadata": {}})
 
 
-@pytest.mark.anyio
 async def test_delete_and_reinsert_propagates_insert_failure(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
     """If reinsertion fails the original document should be restored when possible."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(return_value=SimpleNamespace(deleted_count=1))
-    error = fake_pymongo.PyMongoError("insert failed")
-    collection.insert_one = AsyncMock(side_effect=[error, None])
+    collection = FakeCollection(
+        delete_one_result=SimpleNamespace(deleted_count=1),
+        insert_one_result=fake_pymongo.PyMongoError("insert failed"),
+    )
     monkeypatch.setattr(records, "_reload_document", AsyncMock())
 
     with pytest.raises(fake_pymongo.PyMongoError):
         await records._delete_and_reinsert(collection, {"_id": "abc"}, {"_id": "abc"})
 
-    assert collection.insert_one.await_args_list[1].args[0] == {"_id": "abc"}
+    assert collection.insert_one_calls[1] == call({"_id": "abc"})
 
 
-@pytest.mark.anyio
 async def test_delete_and_reinsert_returns_reloaded(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
     """Successful reinsertion should return the freshly loaded document."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(return_value=SimpleNamespace(deleted_count=1))
-    collection.insert_one = AsyncMock()
+    collection = FakeCollection(delete_one_result=SimpleNamespace(deleted_count=1))
     monkeypatch.setattr(records, "_reload_document", AsyncMock(return_value={"_id": "abc"}))
 
     document = await records._delete_and_reinsert(collection, {"_id": "abc"}, {"_id": "abc"})
@@ -282,76 +271,64 @@ async def test_delete_and_reinsert_returns_reloaded(fake_pymongo: FakePyMongo, m
     assert document == {"_id": "abc"}
 
 
-@pytest.mark.anyio
 async def test_delete_and_reinsert_requires_existing_document(fake_pymongo: FakePyMongo) -> None:
     """Deleting a missing document should raise a not-found error."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(return_value=SimpleNamespace(deleted_count=0))
+    collection = FakeCollection(delete_one_result=SimpleNamespace(deleted_count=0))
 
     with pytest.raises(RecordNotFoundError):
         await records._delete_and_reinsert(collection, {"_id": "abc"}, {"_id": "abc"})
 
 
-@pytest.mark.anyio
 async def test_reload_document_requires_document() -> None:
     """The reload helper should raise when a document cannot be found."""
 
-    collection = AsyncMock()
-    collection.find_one = AsyncMock(return_value=None)
+    collection = FakeCollection(find_one_result=None)
 
     with pytest.raises(RecordPersistenceError):
         await records._reload_document(collection, "abc")
 
 
-def test_is_timeseries_restriction_detects_keywords(fake_pymongo: FakePyMongo) -> None:
+def test_is_timeseries_restriction_detects_keywords(fake_pymongo_module: FakePyMongo) -> None:
     """Error messages mentioning time-series features should be detected."""
 
-    error = fake_pymongo.OperationFailure("Time-series collections cannot update metaField")
+    error = fake_pymongo_module.OperationFailure("Time-series collections cannot update metaField")
     assert records._is_timeseries_restriction(error) is True
 
-    other_error = fake_pymongo.OperationFailure("other failure")
+    assert records._is_timeseries_restriction(fake_pymongo_module.OperationFailure("Time Series update")) is True
+
+    other_error = fake_pymongo_module.OperationFailure("other failure")
     assert records._is_timeseries_restriction(other_error) is False
 
 
-@pytest.mark.anyio
-async def test_delete_record_success(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_delete_record_success(fake_pymongo: FakePyMongo) -> None:
     """Deleting a record should call the collection and return silently."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(return_value=SimpleNamespace(deleted_count=1))
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(delete_one_result=SimpleNamespace(deleted_count=1))
 
     await records.delete_record(collection, "abc")
-    collection.delete_one.assert_awaited_once_with({"_id": "abc"})
+    assert collection.delete_one_calls == [call({"_id": "abc"})]
 
 
-@pytest.mark.anyio
-async def test_delete_record_missing(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_delete_record_missing(fake_pymongo: FakePyMongo) -> None:
     """Missing records should raise ``RecordNotFoundError``."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(return_value=SimpleNamespace(deleted_count=0))
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(delete_one_result=SimpleNamespace(deleted_count=0))
 
     with pytest.raises(RecordNotFoundError):
         await records.delete_record(collection, "abc")
 
 
-@pytest.mark.anyio
-async def test_delete_record_wraps_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_delete_record_wraps_errors(fake_pymongo: FakePyMongo) -> None:
     """Low level PyMongo errors should surface as ``RecordDeletionError``."""
 
-    collection = AsyncMock()
-    collection.delete_one = AsyncMock(side_effect=fake_pymongo.PyMongoError("boom"))
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
+    collection = FakeCollection(delete_one_result=fake_pymongo.PyMongoError("boom"))
 
     with pytest.raises(RecordDeletionError):
         await records.delete_record(collection, "abc")
 
 
-@pytest.mark.anyio
-async def test_search_records_supports_filters(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_search_records_supports_filters(fake_pymongo: FakePyMongo) -> None:
     """Search helper should build queries using alias resolution and coercion."""
 
     documents = [{"_id": "abc", "source": "sensor", "timestamp": datetime.now(tz=timezone.utc)}]
@@ -362,8 +339,6 @@ async def test_search_records_supports_filters(fake_pymongo: FakePyMongo, monkey
     collection = MagicMock()
     collection.find.return_value = cursor
 
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
-
     results, only_latest = await records.search_records(
         collection,
         field="id",
@@ -375,13 +350,13 @@ async def test_search_records_supports_filters(fake_pymongo: FakePyMongo, monkey
     )
 
     collection.find.assert_called_once()
+    assert "hint" not in collection.find.call_args.kwargs
     assert results[0]["id"] == "abc"
     assert only_latest is False
     cursor.to_list.assert_awaited_once_with(length=5)
 
 
-@pytest.mark.anyio
-async def test_search_records_returns_latest_only(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_search_records_returns_latest_only(fake_pymongo: FakePyMongo) -> None:
     """Requesting the latest record should enforce a limit of one document."""
 
     cursor = MagicMock()
@@ -392,7 +367,6 @@ async def test_search_records_returns_latest_only(fake_pymongo: FakePyMongo, mon
     cursor.limit.return_value = limited_cursor
     collection = MagicMock()
     collection.find.return_value = cursor
-    monkeypatch.setattr(records, "_object_id", lambda value: value)
 
     results, only_latest = await records.search_records(
         collection,
@@ -407,9 +381,9 @@ async def test_search_records_returns_latest_only(fake_pymongo: FakePyMongo, mon
     assert only_latest is True
     assert results == [{"id": "abc"}]
     cursor.limit.assert_called_once_with(1)
+    collection.find.assert_called_once_with({}, hint=records.TIME_INDEX_HINT)
 
 
-@pytest.mark.anyio
 async def test_search_records_wraps_errors(fake_pymongo: FakePyMongo) -> None:
     """Errors during search should raise ``RecordQueryError``."""
 
@@ -422,3 +396,72 @@ async def test_search_records_wraps_errors(fake_pymongo: FakePyMongo) -> None:
 
     with pytest.raises(RecordQueryError):
         await records.search_records(collection, None, None, None, None, False, 5)
+
+
+async def test_count_records_uses_estimated_count_without_filters(
+    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Unfiltered counts should rely on collection metadata."""
+
+    monkeypatch.setattr(records, "_count_cache", {})
+    collection = FakeCollection(full_name="metrics.measurements", estimated_document_count_result=42)
+
+    assert await records.count_records(collection, None, None, None, None) == 42
+    assert collection.count_documents_calls == []
+
+
+async def test_count_records_caches_filtered_counts(
+    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Filtered counts should be bounded by ``maxTimeMS`` and reused across pages."""
+
+    monkeypatch.setattr(records, "_count_cache", {})
+    collection = FakeCollection(full_name="metrics.measurements", count_documents_result=7)
+
+    first = await records.count_records(collection, "acronym", "swe", None, None)
+    second = await records.count_records(collection, "acronym", "swe", None, None)
+
+    assert first == second == 7
+    assert collection.count_documents_calls == [
+        call({"acronym": "swe"}, maxTimeMS=records.COUNT_MAX_TIME_MS)
+    ]
+
+
+async def test_count_records_returns_none_on_timeout(
+    fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A count exceeding ``maxTimeMS`` is optional and should not fail the caller."""
+
+    monkeypatch.setattr(records, "_count_cache", {})
+    collection = FakeCollection(
+        full_name="metrics.measurements",
+        count_documents_result=fake_pymongo.ExecutionTimeout("operation exceeded time limit"),
+    )
+
+    assert await records.count_records(collection, "acronym", "swe", None, None) is None
+    assert records._count_cache == {}
+
+
+async def test_count_records_wraps_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Count failures should surface as ``RecordQueryError``."""
+
+    monkeypatch.setattr(records, "_count_cache", {})
+    collection = FakeCollection(
+        full_name="metrics.measurements",
+        count_documents_result=fake_pymongo.PyMongoError("boom"),
+    )
+
+    with pytest.raises(RecordQueryError):
+        await records.count_records(collection, "acronym", "swe", None, None)
+
+
+def test_object_id_validates_without_raising_internally() -> None:
+    """Valid identifiers should convert while invalid ones raise the service error."""
+
+    bson = pytest.importorskip("bson")
+    ObjectId = bson.ObjectId
+
+    assert _real_object_id("507f1f77bcf86cd799439011") == ObjectId("507f1f77bcf86cd799439011")
+
+    with pytest.raises(InvalidRecordIdError):
+        _real_object_id("not-an-object-id")
@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
 from types import SimpleNamespace
 from typing import Any, Iterable
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, create_autospec
 
 import pytest
 
-from app.db.mongo import MongoConnectionError
+from app.core.config import get_settings
+from app.db.mongo import MongoConnectionError, MongoDBManager
 from app.services import tokens
 from app.services.tokens import (
     CreatedToken,
@@ -23,46 +25,72 @@ from app.services.tokens import (
 from tests.conftest import FakePyMongo
 
 
-@pytest.fixture()
-def anyio_backend() -> str:
-    """Execute anyio-based tests on the asyncio backend."""
+pytestmark = pytest.mark.anyio
+
+_SECRET = "secret"
+_SECRET_HASH = _hash_token(_SECRET)
+_SECRET_DIGEST = tokens._token_digest(_SECRET)
+
+
+@pytest.fixture(autouse=True)
+def _clear_token_cache() -> None:
+    """Start every test with empty token metadata and rejection caches."""
 
-    return "asyncio"
+    tokens._token_cache.clear()
+    tokens._rejected_tokens.clear()
+
+
+@pytest.fixture(autouse=True)
+def recorder(monkeypatch: pytest.MonkeyPatch) -> tokens.TokenUsageRecorder:
+    """Isolate queued ``last_used_at`` stamps per test."""
+
+    instance = tokens.TokenUsageRecorder()
+    monkeypatch.setattr(tokens, "token_usage_recorder", instance)
+    return instance
 
 
 class _Cursor:
-    """Simple asynchronous iterator emulating Motor's cursor."""
+    """Simple asynchronous cursor emulating Motor's batched ``to_list``."""
 
-    def __init__(self, documents: Iterable[dict[str, Any]]) -> None:
+    def __init__(self, documents: Iterable[dict[str, Any]], error: Exception | None = None) -> None:
         self._documents = list(documents)
+        self._error = error
+        self.batch: int | None = None
 
-    def __aiter__(self):
-        self._iter = iter(self._documents)
+    def batch_size(self, size: int) -> "_Cursor":
+        self.batch = size
         return self
 
-    async def __anext__(self):
-        try:
-            return next(self._iter)
-        except StopIteration as exc:
-            raise StopAsyncIteration from exc
-
-
-def _build_manager() -> SimpleNamespace:
-    return SimpleNamespace(
-        find_token_document=AsyncMock(),
-        get_timeseries_collection_for_database=AsyncMock(),
-        get_token_collection_for_database=AsyncMock(),
-        iter_token_collections=AsyncMock(),
-        remember_token_location=MagicMock(),
-        forget_token_location=MagicMock(),
-    )
+    async def to_list(self, length: int) -> list[dict[str, Any]]:
+        if self._error is not None:
+            raise self._error
+        chunk, self._documents = self._documents[:length], self._documents[length:]
+        return chunk
+
+
+@pytest.fixture(scope="module")
+def _module_manager() -> MongoDBManager:
+    """Build an autospecced ``mongo_manager`` stand-in once for the module."""
+
+    return create_autospec(MongoDBManager, spec_set=True, instance=True)
+
+
+@pytest.fixture()
+def manager(_module_manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch) -> MongoDBManager:
+    """Install the shared ``mongo_manager`` stand-in with its mocks reset for this test."""
+
+    _module_manager.reset_mock(return_value=True, side_effect=True)
+    monkeypatch.setattr(tokens, "mongo_manager", _module_manager)
+    return _module_manager
 
 
-@pytest.mark.anyio
-async def test_fetch_token_metadata_updates_last_used(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
-    """Fetching metadata should update ``last_used_at`` in storage."""
+async def test_fetch_token_metadata_updates_last_used(
+    fake_pymongo: FakePyMongo,
+    recorder: tokens.TokenUsageRecorder,
+    manager: MongoDBManager,
+) -> None:
+    """Fetching metadata should queue a ``last_used_at`` update."""
 
-    manager = _build_manager()
     collection = AsyncMock()
     manager.find_token_document.return_value = ({
         "_id": "object-id",
@@ -71,58 +99,248 @@ async def test_fetch_token_metadata_updates_last_used(fake_pymongo: FakePyMongo,
         "description": "sensor",
         "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
     }, collection)
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
-    metadata = await tokens.fetch_token_metadata("secret")
+    metadata = await tokens.fetch_token_metadata(_SECRET)
 
     assert isinstance(metadata, TokenMetadata)
-    collection.update_one.assert_awaited_once()
+    assert list(recorder._pending["metrics"]) == ["object-id"]
+    collection.update_one.assert_not_awaited()
 
 
-@pytest.mark.anyio
-async def test_fetch_token_metadata_handles_missing(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
-    """Missing tokens should raise ``TokenNotFoundError``."""
+async def test_fetch_token_database_returns_bound_database(
+    recorder: tokens.TokenUsageRecorder,
+    manager: MongoDBManager,
+) -> None:
+    """The authentication helper should return only the token's database."""
 
-    manager = _build_manager()
-    manager.find_token_document.return_value = (None, None)
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
+    manager.find_token_document.return_value = (
+        {"_id": "object-id", "database": "metrics", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+        AsyncMock(),
+    )
 
-    with pytest.raises(TokenNotFoundError):
-        await tokens.fetch_token_metadata("secret")
+    assert await tokens.fetch_token_database(_SECRET) == "metrics"
+    _, kwargs = manager.find_token_document.await_args
+    assert "token_hash" not in kwargs["projection"]
+    assert list(recorder._pending["metrics"]) == ["object-id"]
 
 
-@pytest.mark.anyio
-async def test_fetch_token_metadata_wraps_update_error(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
-    """PyMongo errors should surface as persistence issues."""
+async def test_fetch_token_database_reuses_supplied_digest(
+    manager: MongoDBManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A digest already computed by the caller should not be hashed again."""
+
+    manager.find_token_document.return_value = (
+        {"_id": "object-id", "database": "metrics", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+        AsyncMock(),
+    )
+    monkeypatch.setattr(tokens, "_token_digest", None)
+
+    assert await tokens.fetch_token_database(_SECRET, digest=_SECRET_DIGEST) == "metrics"
+    manager.find_token_document.assert_awaited_once_with(
+        _SECRET_HASH, projection=tokens._TOKEN_METADATA_PROJECTION
+    )
+
+
+async def test_fetch_token_metadata_serves_repeated_lookups_from_cache(
+    fake_pymongo: FakePyMongo,
+    recorder: tokens.TokenUsageRecorder,
+    manager: MongoDBManager,
+) -> None:
+    """Repeated lookups should reuse cached metadata and still stamp usage."""
 
-    manager = _build_manager()
     collection = AsyncMock()
-    collection.update_one = AsyncMock(side_effect=fake_pymongo.PyMongoError("boom"))
     manager.find_token_document.return_value = ({
         "_id": "object-id",
         "token_hash": "hashed",
         "database": "metrics",
-        "description": None,
-        "created_at": datetime.now(tz=timezone.utc),
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
     }, collection)
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
+    manager.get_token_collection_for_database.return_value = collection
+
+    first = await tokens.fetch_token_metadata(_SECRET)
+    second = await tokens.fetch_token_metadata(_SECRET)
+
+    assert second is first
+    manager.find_token_document.assert_awaited_once()
+    assert list(recorder._pending["metrics"]) == ["object-id"]
 
-    with pytest.raises(TokenPersistenceError):
-        await tokens.fetch_token_metadata("secret")
 
+async def test_fetch_token_metadata_rejects_expired_tokens(
+    fake_pymongo: FakePyMongo,
+    recorder: tokens.TokenUsageRecorder,
+    manager: MongoDBManager,
+) -> None:
+    """Expired tokens awaiting cleanup must be rejected and remembered as invalid."""
+
+    collection = AsyncMock()
+    manager.find_token_document.return_value = ({
+        "_id": "object-id",
+        "token_hash": "hashed",
+        "database": "metrics",
+        "created_at": datetime(2024, 1, 1),
+        "expires_at": datetime(2024, 1, 2),
+    }, collection)
+
+    for _ in range(2):
+        with pytest.raises(TokenNotFoundError):
+            await tokens.fetch_token_metadata(_SECRET)
+
+    manager.find_token_document.assert_awaited_once()
+    assert _SECRET_DIGEST not in tokens._token_cache
+    assert recorder._pending == {}
+
+
+def test_cache_deadline_is_clamped_to_token_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Cache entries must not outlive the token or the configured TTL."""
+
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    monkeypatch.setattr(tokens.time, "monotonic", lambda: 100.0)
+
+    assert tokens._cache_deadline(None) == 100.0 + get_settings().token_cache_ttl_seconds
+    assert tokens._cache_deadline(tokens._remaining_lifetime(datetime(2024, 1, 1, 0, 0, 5), now)) == 105.0
+    assert tokens._cache_deadline(0.0) is None
+
+
+async def test_fetch_token_metadata_handles_missing(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
+    """Missing tokens should raise ``TokenNotFoundError``."""
+
+    manager.find_token_document.return_value = (None, None)
+
+    with pytest.raises(TokenNotFoundError):
+        await tokens.fetch_token_metadata(_SECRET)
+
+
+async def test_fetch_token_metadata_short_circuits_repeated_rejections(
+    manager: MongoDBManager,
+) -> None:
+    """Replayed unknown tokens should be rejected without querying MongoDB again."""
+
+    manager.find_token_document.return_value = (None, None)
+
+    for _ in range(100):
+        with pytest.raises(TokenNotFoundError):
+            await tokens.fetch_token_metadata("bad-token")
+
+    manager.find_token_document.assert_awaited_once()
+
+
+async def test_create_token_clears_rejection_for_new_value(manager: MongoDBManager) -> None:
+    """Creating a token with a previously rejected value must make it usable at once."""
+
+    manager.find_token_document.return_value = (None, None)
+    manager.get_token_collection_for_database.return_value = AsyncMock()
 
-@pytest.mark.anyio
-async def test_create_token_persists_document(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(TokenNotFoundError):
+        await tokens.fetch_token_metadata(_SECRET)
+
+    await tokens.create_token(database="metrics", token_value=_SECRET)
+
+    assert _SECRET_DIGEST not in tokens._rejected_tokens
+
+
+async def test_usage_recorder_flushes_one_bulk_write_per_database(manager: MongoDBManager) -> None:
+    """Queued stamps should be coalesced into a single unordered ``bulk_write``."""
+
+    collection = AsyncMock()
+    manager.get_token_collection_for_database.return_value = collection
+
+    recorder = tokens.TokenUsageRecorder()
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    latest = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    recorder.record("metrics", "id1", first)
+    recorder.record("metrics", "id1", latest)
+    recorder.record("metrics", "id2", first)
+
+    await recorder.flush()
+
+    manager.get_token_collection_for_database.assert_awaited_once_with("metrics")
+    (operations,), kwargs = collection.bulk_write.await_args
+    assert kwargs == {"ordered": False}
+    assert operations == [
+        tokens.UpdateOne({"_id": "id1"}, {"$set": {"last_used_at": latest}}),
+        tokens.UpdateOne({"_id": "id2"}, {"$set": {"last_used_at": first}}),
+    ]
+
+    await recorder.flush()
+    collection.bulk_write.assert_awaited_once()
+
+
+async def test_usage_recorder_logs_write_errors(manager: MongoDBManager) -> None:
+    """Write failures should be logged instead of failing authentication."""
+
+    collection = AsyncMock()
+    collection.bulk_write = AsyncMock(side_effect=tokens.PyMongoError("boom"))
+    manager.get_token_collection_for_database.return_value = collection
+
+    recorder = tokens.TokenUsageRecorder()
+    recorder.record("metrics", "id1", datetime.now(tz=timezone.utc))
+
+    await recorder.flush()
+
+    collection.bulk_write.assert_awaited_once()
+    assert recorder._pending == {}
+
+
+async def test_usage_recorder_stop_flushes_pending(manager: MongoDBManager) -> None:
+    """Stopping the recorder should cancel the loop and persist queued stamps."""
+
+    collection = AsyncMock()
+    manager.get_token_collection_for_database.return_value = collection
+
+    recorder = tokens.TokenUsageRecorder(interval_seconds=3600)
+    recorder.start()
+    recorder.record("metrics", "id1", datetime.now(tz=timezone.utc))
+
+    await recorder.stop()
+
+    collection.bulk_write.assert_awaited_once()
+    assert recorder._task is None
+
+
+async def test_usage_recorder_stop_survives_unexpected_errors(manager: MongoDBManager) -> None:
+    """Shutdown should log, not raise, when the final flush fails unexpectedly."""
+
+    manager.get_token_collection_for_database.side_effect = RuntimeError("boom")
+
+    recorder = tokens.TokenUsageRecorder(interval_seconds=3600)
+    recorder.start()
+    recorder.record("metrics", "id1", datetime.now(tz=timezone.utc))
+
+    await recorder.stop()
+
+    assert recorder._task is None
+    assert recorder._pending == {}
+
+
+async def test_coarse_clock_serves_ticked_time_until_stopped() -> None:
+    """The coarse clock should reuse its ticked value while running."""
+
+    clock = tokens.CoarseClock(tick_seconds=3600)
+    clock.start()
+    try:
+        assert clock.now() is clock.now()
+    finally:
+        await clock.stop()
+
+    assert clock._task is None
+    assert clock.now() is not clock.now()
+
+
+async def test_create_token_persists_document(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Creating a token should prepare collections and store metadata."""
 
-    manager = _build_manager()
     token_collection = AsyncMock()
     manager.get_token_collection_for_database.return_value = token_collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     created = await tokens.create_token(
         database="metrics",
-        token_value="secret",
+        token_value=_SECRET,
         description="Sensor access",
         ttl=3600,
     )
@@ -130,56 +348,54 @@ async def test_create_token_persists_document(fake_pymongo: FakePyMongo, monkeyp
     assert isinstance(created, CreatedToken)
     manager.get_timeseries_collection_for_database.assert_awaited_once_with("metrics")
     token_collection.insert_one.assert_awaited_once()
-    manager.remember_token_location.assert_called_once_with(_hash_token("secret"), "metrics")
+    manager.remember_token_location.assert_called_once_with(_SECRET_HASH, "metrics")
     assert created.expires_at is not None
 
 
-@pytest.mark.anyio
-async def test_create_token_handles_duplicate(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_create_token_handles_duplicate(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Duplicate hashes should raise ``TokenConflictError``."""
 
-    manager = _build_manager()
     token_collection = AsyncMock()
-    token_collection.insert_one = AsyncMock(side_effect=fake_pymongo.DuplicateKeyError("exists"))
+    token_collection.insert_one = AsyncMock(side_effect=tokens.DuplicateKeyError("exists"))
     manager.get_token_collection_for_database.return_value = token_collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenConflictError):
-        await tokens.create_token(database="metrics", token_value="secret")
+        await tokens.create_token(database="metrics", token_value=_SECRET)
 
 
-@pytest.mark.anyio
-async def test_create_token_wraps_generic_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_create_token_wraps_generic_errors(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Unexpected insert errors should raise a persistence error."""
 
-    manager = _build_manager()
     token_collection = AsyncMock()
-    token_collection.insert_one = AsyncMock(side_effect=fake_pymongo.PyMongoError("boom"))
+    token_collection.insert_one = AsyncMock(side_effect=tokens.PyMongoError("boom"))
     manager.get_token_collection_for_database.return_value = token_collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenPersistenceError):
-        await tokens.create_token(database="metrics", token_value="secret")
+        await tokens.create_token(database="metrics", token_value=_SECRET)
 
 
-@pytest.mark.anyio
-async def test_create_token_handles_preparation_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_create_token_handles_preparation_errors(manager: MongoDBManager) -> None:
     """Failures preparing the database should surface as persistence errors."""
 
-    manager = _build_manager()
     manager.get_timeseries_collection_for_database.side_effect = MongoConnectionError("down")
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenPersistenceError):
         await tokens.create_token(database="metrics")
 
 
-@pytest.mark.anyio
-async def test_list_tokens_collects_documents(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_list_tokens_collects_documents(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Listing tokens should iterate over every collection."""
 
-    manager = _build_manager()
-    collection = SimpleNamespace(find=lambda: _Cursor([
+    collection = SimpleNamespace(find=lambda query, projection: _Cursor([
         {
             "_id": "id1",
             "token_hash": "hash",
@@ -190,7 +406,6 @@ async def test_list_tokens_collects_documents(fake_pymongo: FakePyMongo, monkeyp
         }
     ]))
     manager.iter_token_collections.return_value = [("metrics", collection)]
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     results = await tokens.list_tokens()
 
@@ -199,58 +414,96 @@ async def test_list_tokens_collects_documents(fake_pymongo: FakePyMongo, monkeyp
     assert results[0].database == "metrics"
 
 
-@pytest.mark.anyio
-async def test_list_tokens_wraps_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_list_tokens_preserves_collection_order(manager: MongoDBManager) -> None:
+    """Concurrent collection reads should still be returned in collection order."""
+
+    def _collection(token_id: str) -> SimpleNamespace:
+        document = {"_id": token_id, "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+        return SimpleNamespace(find=lambda query, projection: _Cursor([document]))
+
+    manager.iter_token_collections.return_value = [
+        ("alpha", _collection("id1")),
+        ("beta", _collection("id2")),
+    ]
+
+    results = await tokens.list_tokens()
+
+    assert [(token.database, token.id) for token in results] == [("alpha", "id1"), ("beta", "id2")]
+
+
+async def test_list_tokens_wraps_errors(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Errors while iterating tokens should raise ``TokenPersistenceError``."""
 
-    manager = _build_manager()
     manager.iter_token_collections.side_effect = MongoConnectionError("down")
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenPersistenceError):
         await tokens.list_tokens()
 
 
-@pytest.mark.anyio
-async def test_list_tokens_handles_collection_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_list_tokens_handles_collection_errors(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Collection level failures should also be wrapped."""
 
-    manager = _build_manager()
+    failing_cursor = _Cursor([], error=tokens.PyMongoError("boom"))
+    failing_collection = SimpleNamespace(find=lambda query, projection: failing_cursor)
+    manager.iter_token_collections.return_value = [("metrics", failing_collection)]
 
-    class _BadCursor:
-        def __aiter__(self):
-            return self
+    with pytest.raises(TokenPersistenceError):
+        await tokens.list_tokens()
 
-        async def __anext__(self):
-            raise fake_pymongo.PyMongoError("boom")
 
-    failing_collection = SimpleNamespace(find=lambda: _BadCursor())
-    manager.iter_token_collections.return_value = [("metrics", failing_collection)]
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
+async def test_list_tokens_cancels_pending_reads_on_failure(manager: MongoDBManager) -> None:
+    """A failing database read should cancel the reads still in flight."""
+
+    cancelled = asyncio.Event()
+
+    class _StalledCursor(_Cursor):
+        async def to_list(self, length: int) -> list[dict[str, Any]]:
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return []
+
+    failing_cursor = _Cursor([], error=tokens.PyMongoError("boom"))
+    stalled_cursor = _StalledCursor([])
+    manager.iter_token_collections.return_value = [
+        ("slow", SimpleNamespace(find=lambda query, projection: stalled_cursor)),
+        ("metrics", SimpleNamespace(find=lambda query, projection: failing_cursor)),
+    ]
 
     with pytest.raises(TokenPersistenceError):
         await tokens.list_tokens()
 
+    assert cancelled.is_set()
 
-@pytest.mark.anyio
-async def test_revoke_token_deletes_document(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+
+async def test_revoke_token_deletes_document(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Revoking a token should remove it and clear cached locations."""
 
-    manager = _build_manager()
     collection = AsyncMock()
     collection.find_one_and_delete = AsyncMock(return_value={
         "_id": "id1",
-        "token_hash": "hash",
+        "token_hash": _SECRET_HASH,
     })
     manager.get_token_collection_for_database.return_value = collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
+    tokens._token_cache.set(_SECRET_DIGEST, object())
 
     await tokens.revoke_token(database="metrics", token_id="507f1f77bcf86cd799439011")
 
-    manager.forget_token_location.assert_called_once_with("hash")
+    manager.forget_token_location.assert_called_once_with(_SECRET_HASH)
+    assert _SECRET_DIGEST not in tokens._token_cache
 
 
-@pytest.mark.anyio
 async def test_revoke_token_rejects_invalid_object_id() -> None:
     """Invalid token identifiers should raise ``TokenNotFoundError``."""
 
@@ -258,29 +511,36 @@ async def test_revoke_token_rejects_invalid_object_id() -> None:
         await tokens.revoke_token(database="metrics", token_id="not-a-valid-objectid")
 
 
-@pytest.mark.anyio
-async def test_revoke_token_handles_missing_document(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_revoke_token_rejects_non_hex_object_id() -> None:
+    """Identifiers with the right length but non-hex characters are rejected."""
+
+    with pytest.raises(TokenNotFoundError):
+        await tokens.revoke_token(database="metrics", token_id="0x" + "a" * 22)
+
+
+async def test_revoke_token_handles_missing_document(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """Missing documents should result in a ``TokenNotFoundError``."""
 
-    manager = _build_manager()
     collection = AsyncMock()
     collection.find_one_and_delete = AsyncMock(return_value=None)
     manager.get_token_collection_for_database.return_value = collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenNotFoundError):
         await tokens.revoke_token(database="metrics", token_id="507f1f77bcf86cd799439011")
 
 
-@pytest.mark.anyio
-async def test_revoke_token_wraps_errors(fake_pymongo: FakePyMongo, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_revoke_token_wraps_errors(
+    fake_pymongo: FakePyMongo,
+    manager: MongoDBManager,
+) -> None:
     """PyMongo errors should be wrapped into persistence exceptions."""
 
-    manager = _build_manager()
     collection = AsyncMock()
-    collection.find_one_and_delete = AsyncMock(side_effect=fake_pymongo.PyMongoError("boom"))
+    collection.find_one_and_delete = AsyncMock(side_effect=tokens.PyMongoError("boom"))
     manager.get_token_collection_for_database.return_value = collection
-    monkeypatch.setattr(tokens, "mongo_manager", manager)
 
     with pytest.raises(TokenPersistenceError):
         await tokens.revoke_token(database="metrics", token_id="507f1f77bcf86cd799439011")